@@ -0,0 +1,34 @@
+"""Add (clinic_id, updated_at) indexes for today's-updates counts
+
+Revision ID: add_clinic_updated_at_indexes
+Revises: add_exam_catalog
+Create Date: 2026-10-18 09:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_clinic_updated_at_indexes"
+down_revision: Union[str, None] = "add_exam_catalog"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create composite (clinic_id, updated_at) indexes on the registration tables."""
+    op.create_index("ix_patients_clinic_id_updated_at", "patients", ["clinic_id", "updated_at"], unique=False)
+    op.create_index("ix_products_clinic_id_updated_at", "products", ["clinic_id", "updated_at"], unique=False)
+    op.create_index("ix_service_items_clinic_id_updated_at", "service_items", ["clinic_id", "updated_at"], unique=False)
+    op.create_index("ix_users_clinic_id_updated_at", "users", ["clinic_id", "updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the composite (clinic_id, updated_at) indexes."""
+    op.drop_index("ix_users_clinic_id_updated_at", table_name="users")
+    op.drop_index("ix_service_items_clinic_id_updated_at", table_name="service_items")
+    op.drop_index("ix_products_clinic_id_updated_at", table_name="products")
+    op.drop_index("ix_patients_clinic_id_updated_at", table_name="patients")
@@ -0,0 +1,49 @@
+"""Add barcode, low-stock and movement-timeline indexes for stock queries
+
+Revision ID: add_stock_lookup_indexes
+Revises: add_clinic_updated_at_indexes
+Create Date: 2026-10-18 09:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_stock_lookup_indexes"
+down_revision: Union[str, None] = "add_clinic_updated_at_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create composite/partial indexes used by the stock endpoints."""
+    op.create_index(
+        "ix_products_clinic_barcode",
+        "products",
+        ["clinic_id", "barcode"],
+        unique=True,
+        postgresql_where=sa.text("barcode IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_products_lowstock",
+        "products",
+        ["clinic_id"],
+        unique=False,
+        postgresql_where=sa.text("is_active AND current_stock <= min_stock"),
+    )
+    op.create_index(
+        "ix_stock_movements_clinic_id_timestamp",
+        "stock_movements",
+        ["clinic_id", sa.text("timestamp DESC")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Drop the stock lookup indexes."""
+    op.drop_index("ix_stock_movements_clinic_id_timestamp", table_name="stock_movements")
+    op.drop_index("ix_products_lowstock", table_name="products")
+    op.drop_index("ix_products_clinic_barcode", table_name="products")
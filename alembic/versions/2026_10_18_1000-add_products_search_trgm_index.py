@@ -0,0 +1,34 @@
+"""Add pg_trgm GIN index for product search
+
+Revision ID: add_products_search_trgm
+Revises: add_stock_lookup_indexes
+Create Date: 2026-10-18 10:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_products_search_trgm"
+down_revision: Union[str, None] = "add_stock_lookup_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and index the lowercased product search document."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Expression must stay identical to _PRODUCT_SEARCH_DOCUMENT in app/api/endpoints/stock.py
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_products_search_trgm ON products USING gin "
+        "((lower(coalesce(products.name, '') || ' ' || coalesce(products.description, '') "
+        "|| ' ' || coalesce(products.supplier, ''))) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Drop the product search trigram index (the extension is left installed)."""
+    op.execute("DROP INDEX IF EXISTS ix_products_search_trgm")
@@ -0,0 +1,36 @@
+"""Add pg_trgm GIN index for help article search
+
+Revision ID: add_help_articles_search_trgm
+Revises: add_products_search_trgm
+Create Date: 2026-10-18 10:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_help_articles_search_trgm"
+down_revision: Union[str, None] = "add_products_search_trgm"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and index title, content and tags for ILIKE search."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_help_articles_search_trgm",
+        "help_articles",
+        ["title", "content", "tags"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops", "content": "gin_trgm_ops", "tags": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Drop the help article trigram index (the extension is left installed)."""
+    op.drop_index("ix_help_articles_search_trgm", table_name="help_articles")
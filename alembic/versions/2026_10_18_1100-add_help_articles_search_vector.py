@@ -0,0 +1,49 @@
+"""Replace help article trigram index with a full-text search vector
+
+Revision ID: add_help_articles_search_vector
+Revises: add_help_articles_search_trgm
+Create Date: 2026-10-18 11:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_help_articles_search_vector"
+down_revision: Union[str, None] = "add_help_articles_search_trgm"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add a generated tsvector column with a GIN index; drop the trigram index it supersedes."""
+    op.execute(
+        "ALTER TABLE help_articles ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('portuguese', coalesce(title, '') || ' ' "
+        "|| coalesce(content, '') || ' ' || coalesce(tags, ''))) STORED"
+    )
+    op.create_index(
+        "ix_help_articles_search_vector",
+        "help_articles",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.drop_index("ix_help_articles_search_trgm", table_name="help_articles")
+
+
+def downgrade() -> None:
+    """Restore the trigram index and drop the search vector."""
+    op.create_index(
+        "ix_help_articles_search_trgm",
+        "help_articles",
+        ["title", "content", "tags"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops", "content": "gin_trgm_ops", "tags": "gin_trgm_ops"},
+    )
+    op.drop_index("ix_help_articles_search_vector", table_name="help_articles")
+    op.drop_column("help_articles", "search_vector")
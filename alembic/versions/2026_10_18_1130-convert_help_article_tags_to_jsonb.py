@@ -0,0 +1,99 @@
+"""Store help article tags as JSONB
+
+Revision ID: help_article_tags_jsonb
+Revises: add_help_articles_search_vector
+Create Date: 2026-10-18 11:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "help_article_tags_jsonb"
+down_revision: Union[str, None] = "add_help_articles_search_vector"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _add_search_vector(tags_expr: str) -> None:
+    op.execute(
+        "ALTER TABLE help_articles ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('portuguese', coalesce(title, '') || ' ' "
+        f"|| coalesce(content, '') || ' ' || coalesce({tags_expr}, ''))) STORED"
+    )
+    op.create_index(
+        "ix_help_articles_search_vector",
+        "help_articles",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def _drop_search_vector() -> None:
+    op.drop_index("ix_help_articles_search_vector", table_name="help_articles")
+    op.drop_column("help_articles", "search_vector")
+
+
+def upgrade() -> None:
+    """Convert tags from a JSON string to JSONB and index it for containment queries."""
+    # Articles are edited outside the API, so tags may hold hand-entered text
+    # such as "a, b". The old read path treated anything that was not a JSON
+    # array as no tags; convert those to NULL instead of failing the cast.
+    op.execute(
+        """
+        CREATE FUNCTION pg_temp.help_article_tags_to_jsonb(raw text) RETURNS jsonb
+        LANGUAGE plpgsql IMMUTABLE AS $$
+        DECLARE
+            parsed jsonb;
+        BEGIN
+            parsed := NULLIF(raw, '')::jsonb;
+            IF jsonb_typeof(parsed) = 'array' THEN
+                RETURN parsed;
+            END IF;
+            RETURN NULL;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    # The generated search vector depends on tags, so rebuild it around the type change
+    _drop_search_vector()
+    op.alter_column(
+        "help_articles",
+        "tags",
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=True,
+        postgresql_using="pg_temp.help_article_tags_to_jsonb(tags)",
+    )
+    op.execute("DROP FUNCTION pg_temp.help_article_tags_to_jsonb(text)")
+    _add_search_vector("tags::text")
+    op.create_index(
+        "ix_help_articles_tags",
+        "help_articles",
+        ["tags"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"tags": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Convert tags back to a JSON-encoded text column."""
+    op.drop_index("ix_help_articles_tags", table_name="help_articles")
+    _drop_search_vector()
+    op.alter_column(
+        "help_articles",
+        "tags",
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using="tags::text",
+    )
+    _add_search_vector("tags")
@@ -0,0 +1,33 @@
+"""Add (clinic_id, lower(email)) index for patient lookup by user
+
+Revision ID: add_patients_clinic_email_idx
+Revises: help_article_tags_jsonb
+Create Date: 2026-10-18 12:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_patients_clinic_email_idx"
+down_revision: Union[str, None] = "help_article_tags_jsonb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the composite expression index used to resolve a user's patient record."""
+    op.create_index(
+        "ix_patients_clinic_id_lower_email",
+        "patients",
+        ["clinic_id", sa.text("lower(email)")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Drop the composite expression index."""
+    op.drop_index("ix_patients_clinic_id_lower_email", table_name="patients")
@@ -0,0 +1,28 @@
+"""Add (clinic_id, category) index for help article categories
+
+Revision ID: add_help_articles_category_idx
+Revises: add_patients_clinic_email_idx
+Create Date: 2026-10-18 12:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_help_articles_category_idx"
+down_revision: Union[str, None] = "add_patients_clinic_email_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the composite (clinic_id, category) index."""
+    op.create_index("ix_help_articles_clinic_id_category", "help_articles", ["clinic_id", "category"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the composite (clinic_id, category) index."""
+    op.drop_index("ix_help_articles_clinic_id_category", table_name="help_articles")
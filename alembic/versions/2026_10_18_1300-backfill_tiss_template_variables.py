@@ -0,0 +1,56 @@
+"""Backfill tiss_templates.variables and make it non-nullable
+
+Revision ID: backfill_tiss_template_vars
+Revises: add_help_articles_category_idx
+Create Date: 2026-10-18 13:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "backfill_tiss_template_vars"
+down_revision: Union[str, None] = "add_help_articles_category_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Compute missing variables from xml_template, then forbid NULL."""
+    # Same extraction as extract_variables(): unique {{NAME}} placeholders in
+    # order of first appearance
+    op.execute(
+        r"""
+        UPDATE tiss_templates t
+        SET variables = coalesce((
+            SELECT json_agg(vars.name ORDER BY vars.first_pos)
+            FROM (
+                SELECT m.groups[1] AS name, min(m.pos) AS first_pos
+                FROM regexp_matches(t.xml_template, '\{\{(\w+)\}\}', 'g') WITH ORDINALITY AS m(groups, pos)
+                GROUP BY m.groups[1]
+            ) vars
+        ), '[]'::json)
+        WHERE t.variables IS NULL OR t.variables::text = 'null'
+        """
+    )
+    op.alter_column(
+        "tiss_templates",
+        "variables",
+        existing_type=sa.JSON(),
+        nullable=False,
+        server_default=sa.text("'[]'::json"),
+    )
+
+
+def downgrade() -> None:
+    """Allow NULL variables again (backfilled values are kept)."""
+    op.alter_column(
+        "tiss_templates",
+        "variables",
+        existing_type=sa.JSON(),
+        nullable=True,
+        server_default=None,
+    )
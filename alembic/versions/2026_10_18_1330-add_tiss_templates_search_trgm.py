@@ -0,0 +1,45 @@
+"""Add pg_trgm GIN indexes for TISS template search
+
+Revision ID: add_tiss_templates_search_trgm
+Revises: backfill_tiss_template_vars
+Create Date: 2026-10-18 13:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_tiss_templates_search_trgm"
+down_revision: Union[str, None] = "backfill_tiss_template_vars"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and index name and description for ILIKE search."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_tiss_templates_name_trgm",
+        "tiss_templates",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_tiss_templates_description_trgm",
+        "tiss_templates",
+        ["description"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"description": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Drop the TISS template trigram indexes (the extension is left installed)."""
+    op.drop_index("ix_tiss_templates_description_trgm", table_name="tiss_templates")
+    op.drop_index("ix_tiss_templates_name_trgm", table_name="tiss_templates")
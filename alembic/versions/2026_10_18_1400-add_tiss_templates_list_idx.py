@@ -0,0 +1,33 @@
+"""Add composite index for TISS template listings
+
+Revision ID: add_tiss_templates_list_idx
+Revises: add_tiss_templates_search_trgm
+Create Date: 2026-10-18 14:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_tiss_templates_list_idx"
+down_revision: Union[str, None] = "add_tiss_templates_search_trgm"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the (clinic_id, category, is_active, is_default, name) listing index."""
+    op.create_index(
+        "ix_tiss_templates_list",
+        "tiss_templates",
+        ["clinic_id", "category", "is_active", "is_default", "name"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Drop the TISS template listing index."""
+    op.drop_index("ix_tiss_templates_list", table_name="tiss_templates")
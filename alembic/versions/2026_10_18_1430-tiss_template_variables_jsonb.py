@@ -0,0 +1,58 @@
+"""Store TISS template variables as JSONB
+
+Revision ID: tiss_template_vars_jsonb
+Revises: add_tiss_templates_list_idx
+Create Date: 2026-10-18 14:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "tiss_template_vars_jsonb"
+down_revision: Union[str, None] = "add_tiss_templates_list_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Convert variables from JSON to JSONB with a '[]'::jsonb default."""
+    # The json default cannot be carried across the type change, so swap it around it
+    op.alter_column("tiss_templates", "variables", existing_type=sa.JSON(), server_default=None)
+    op.alter_column(
+        "tiss_templates",
+        "variables",
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using="variables::jsonb",
+    )
+    op.alter_column(
+        "tiss_templates",
+        "variables",
+        existing_type=postgresql.JSONB(),
+        server_default=sa.text("'[]'::jsonb"),
+    )
+
+
+def downgrade() -> None:
+    """Convert variables back to JSON."""
+    op.alter_column("tiss_templates", "variables", existing_type=postgresql.JSONB(), server_default=None)
+    op.alter_column(
+        "tiss_templates",
+        "variables",
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="variables::json",
+    )
+    op.alter_column(
+        "tiss_templates",
+        "variables",
+        existing_type=sa.JSON(),
+        server_default=sa.text("'[]'::json"),
+    )
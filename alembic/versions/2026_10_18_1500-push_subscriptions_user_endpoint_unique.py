@@ -0,0 +1,41 @@
+"""Make push subscriptions unique per (user_id, endpoint)
+
+Revision ID: push_subs_user_endpoint_uq
+Revises: tiss_template_vars_jsonb
+Create Date: 2026-10-18 15:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "push_subs_user_endpoint_uq"
+down_revision: Union[str, None] = "tiss_template_vars_jsonb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Drop duplicate subscriptions (keeping the newest) and add the unique constraint."""
+    op.execute(
+        """
+        DELETE FROM push_subscriptions p
+        USING push_subscriptions newer
+        WHERE newer.user_id = p.user_id
+          AND newer.endpoint = p.endpoint
+          AND newer.id > p.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_push_subscriptions_user_endpoint",
+        "push_subscriptions",
+        ["user_id", "endpoint"],
+    )
+
+
+def downgrade() -> None:
+    """Drop the (user_id, endpoint) unique constraint."""
+    op.drop_constraint("uq_push_subscriptions_user_endpoint", "push_subscriptions", type_="unique")
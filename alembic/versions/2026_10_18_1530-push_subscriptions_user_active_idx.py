@@ -0,0 +1,34 @@
+"""Add partial index for active push subscriptions
+
+Revision ID: push_subs_user_active_idx
+Revises: push_subs_user_endpoint_uq
+Create Date: 2026-10-18 15:30:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "push_subs_user_active_idx"
+down_revision: Union[str, None] = "push_subs_user_endpoint_uq"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the user_id index restricted to active subscriptions."""
+    op.create_index(
+        "ix_push_subscriptions_user_active",
+        "push_subscriptions",
+        ["user_id"],
+        unique=False,
+        postgresql_where=sa.text("is_active"),
+    )
+
+
+def downgrade() -> None:
+    """Drop the active push subscriptions index."""
+    op.drop_index("ix_push_subscriptions_user_active", table_name="push_subscriptions")
@@ -0,0 +1,34 @@
+"""Drop the redundant per-clinic product barcode index
+
+Revision ID: drop_products_clinic_barcode_idx
+Revises: push_subs_user_active_idx
+Create Date: 2026-10-18 16:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "drop_products_clinic_barcode_idx"
+down_revision: Union[str, None] = "push_subs_user_active_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Drop ix_products_clinic_barcode; products.barcode is already unique across all clinics."""
+    op.drop_index("ix_products_clinic_barcode", table_name="products")
+
+
+def downgrade() -> None:
+    """Recreate the (clinic_id, barcode) partial unique index."""
+    op.create_index(
+        "ix_products_clinic_barcode",
+        "products",
+        ["clinic_id", "barcode"],
+        unique=True,
+        postgresql_where=sa.text("barcode IS NOT NULL"),
+    )
@@ -738,7 +738,7 @@ async def create_clinic(
     admin_user = User(
         username=username,
         email=admin_email,
-        hashed_password=hash_password(default_password),
+        hashed_password=await asyncio.to_thread(hash_password, default_password),
         first_name="Administrador",
         last_name=clinic_data.name,
         role=UserRoleEnum.ADMIN,  # Legacy enum
@@ -3,6 +3,7 @@ Authentication Endpoints
 Handles user authentication, registration, and token management
 """
 
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -237,7 +238,7 @@ async def register(
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=await asyncio.to_thread(hash_password, user_data.password),
         first_name=user_data.first_name,
         last_name=user_data.last_name,
         role=user_data.role,
@@ -533,7 +534,7 @@ async def reset_password(
         )
     
     # Update password
-    user.hashed_password = hash_password(request_data.new_password)
+    user.hashed_password = await asyncio.to_thread(hash_password, request_data.new_password)
     
     # Mark token as used
     reset_token.used = True
@@ -33,6 +33,7 @@ from app.schemas.financial import (
     ExpenseCreate, ExpenseUpdate, ExpenseResponse
 )
 from app.services.stock_consumption_service import consume_stock_for_procedure, check_stock_availability_for_procedure
+from app.api.endpoints.stock import invalidate_stock_cache
 
 router = APIRouter(tags=["Financial"])
 
@@ -573,6 +574,8 @@ async def create_invoice(
                 )
     
     await db.commit()
+    if any(line_data.procedure_id for line_data in invoice_data.service_items):
+        await invalidate_stock_cache(current_user.clinic_id)
     
     # Return detailed response
     return await get_invoice(db_invoice.id, current_user, db)
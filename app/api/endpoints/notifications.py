@@ -15,6 +15,7 @@ from database import get_async_session
 from app.core.auth import get_current_user
 from app.models import User, UserRole, Appointment, Patient
 from app.models.stock import StockAlert
+from app.api.endpoints.stock import invalidate_stock_cache
 from app.models.message import MessageThread, Message, MessageStatus
 
 
@@ -254,6 +255,8 @@ async def mark_notification_read(
             raise HTTPException(status_code=404, detail="Alert not found")
         alert.is_resolved = True
         await db.commit()
+        # pending_alerts in the stock summary just changed
+        await invalidate_stock_cache(alert.clinic_id)
         return {"status": "ok", "resolved": True}
     elif kind == "message":
         # For message notifications, we don't mark individual messages as read here
@@ -280,6 +283,8 @@ async def delete_notification(
             raise HTTPException(status_code=404, detail="Alert not found")
         alert.is_resolved = True
         await db.commit()
+        # pending_alerts in the stock summary just changed
+        await invalidate_stock_cache(alert.clinic_id)
         return {"status": "ok", "resolved": True}
     return {"status": "ok"}
 
@@ -2,27 +2,86 @@
 Secretary Dashboard API Endpoints
 Provides aggregated data for secretary dashboard
 """
+import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, or_
+from sqlalchemy import select, and_, func, or_, bindparam
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
 
 from app.core.auth import get_current_user, RoleChecker
 from app.models import User, Patient, Appointment, AppointmentStatus, UserRole
-from app.models.financial import ServiceItem, PaymentMethod, Payment, Invoice
+from app.models.financial import ServiceItem, PaymentMethod
 from app.models import Product
 from app.models.task import Task, TaskPriority
 from database import get_async_session
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/secretary", tags=["Secretary Dashboard"])
 
 # Role checker for secretary
 require_secretary = RoleChecker([UserRole.SECRETARY, UserRole.ADMIN])
 
 
+# ==================== Prebuilt Statements ====================
+# Count statements are built once at import time and bound per request with
+# ``clinic_id`` (and ``since`` for today's updates), so handlers skip
+# rebuilding the expression tree and hit SQLAlchemy's compiled cache.
+
+_ACTIVE_PATIENTS_COUNT_STMT = select(func.count()).select_from(Patient).where(
+    Patient.clinic_id == bindparam("clinic_id"),
+    Patient.is_active == True
+)
+
+_PENDING_TASKS_COUNT_STMT = select(func.count()).select_from(Task).where(
+    Task.clinic_id == bindparam("clinic_id"),
+    Task.completed == False
+)
+
+_ACTIVE_SUPPLIES_COUNT_STMT = select(func.count()).select_from(Product).where(
+    Product.clinic_id == bindparam("clinic_id"),
+    Product.is_active == True
+)
+
+_ACTIVE_DOCTORS_COUNT_STMT = select(func.count()).select_from(User).where(
+    User.clinic_id == bindparam("clinic_id"),
+    User.role == UserRole.DOCTOR,
+    User.is_active == True
+)
+
+_ACTIVE_SERVICE_ITEMS_COUNT_STMT = select(func.count()).select_from(ServiceItem).where(
+    ServiceItem.clinic_id == bindparam("clinic_id"),
+    ServiceItem.is_active == True
+)
+
+# Today's updates across patients, products, service items and doctors are
+# fetched as scalar subqueries of a single SELECT (one round-trip, one row);
+# each one is served by the (clinic_id, updated_at) index on its table.
+_TODAY_UPDATES_STMT = select(
+    select(func.count()).select_from(Patient).where(
+        Patient.clinic_id == bindparam("clinic_id"),
+        Patient.updated_at >= bindparam("since")
+    ).scalar_subquery().label("patients"),
+    select(func.count()).select_from(Product).where(
+        Product.clinic_id == bindparam("clinic_id"),
+        Product.updated_at >= bindparam("since")
+    ).scalar_subquery().label("products"),
+    select(func.count()).select_from(ServiceItem).where(
+        ServiceItem.clinic_id == bindparam("clinic_id"),
+        ServiceItem.updated_at >= bindparam("since")
+    ).scalar_subquery().label("service_items"),
+    select(func.count()).select_from(User).where(
+        User.clinic_id == bindparam("clinic_id"),
+        User.role == UserRole.DOCTOR,
+        User.updated_at >= bindparam("since")
+    ).scalar_subquery().label("doctors"),
+)
+
+
 # ==================== Response Models ====================
 
 class SecretaryDashboardStats(BaseModel):
@@ -130,6 +189,7 @@ async def get_secretary_dashboard(
         now = datetime.now(timezone.utc)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start + timedelta(days=1)
+        clinic_params = {"clinic_id": current_user.clinic_id}
         
         # ==================== Get Today's Appointments ====================
         today_appointments_query = select(Appointment, Patient, User).join(
@@ -192,23 +252,11 @@ async def get_secretary_dashboard(
             ))
         
         # ==================== Get Total Patients ====================
-        patients_query = select(func.count(Patient.id)).filter(
-            and_(
-                Patient.clinic_id == current_user.clinic_id,
-                Patient.is_active == True
-            )
-        )
-        patients_result = await db.execute(patients_query)
+        patients_result = await db.execute(_ACTIVE_PATIENTS_COUNT_STMT, clinic_params)
         total_patients = patients_result.scalar() or 0
         
         # ==================== Get Pending Tasks Count ====================
-        pending_tasks_query = select(func.count(Task.id)).filter(
-            and_(
-                Task.clinic_id == current_user.clinic_id,
-                Task.completed == False
-            )
-        )
-        pending_tasks_result = await db.execute(pending_tasks_query)
+        pending_tasks_result = await db.execute(_PENDING_TASKS_COUNT_STMT, clinic_params)
         pending_tasks_count = pending_tasks_result.scalar() or 0
         
         # ==================== Build Response ====================
@@ -224,9 +272,7 @@ async def get_secretary_dashboard(
             today_appointments=today_appointments
         )
         
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+    except SQLAlchemyError as e:
         logger.error(f"Error in get_secretary_dashboard: {str(e)}", exc_info=True)
         
         # Return empty dashboard on error to prevent frontend crashes
@@ -258,62 +304,29 @@ async def get_registration_stats(
         # Use timezone-aware datetime to avoid comparison errors
         now = datetime.now(timezone.utc)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        clinic_params = {"clinic_id": current_user.clinic_id}
+        today_params = {"clinic_id": current_user.clinic_id, "since": today_start}
         
         # ==================== Get Total Patients ====================
-        patients_query = select(func.count(Patient.id)).filter(
-            and_(
-                Patient.clinic_id == current_user.clinic_id,
-                Patient.is_active == True
-            )
-        )
-        patients_result = await db.execute(patients_query)
+        patients_result = await db.execute(_ACTIVE_PATIENTS_COUNT_STMT, clinic_params)
         total_patients = patients_result.scalar() or 0
         
         # ==================== Get Total Supplies (Products) ====================
-        supplies_query = select(func.count(Product.id)).filter(
-            and_(
-                Product.clinic_id == current_user.clinic_id,
-                Product.is_active == True
-            )
-        )
-        supplies_result = await db.execute(supplies_query)
+        supplies_result = await db.execute(_ACTIVE_SUPPLIES_COUNT_STMT, clinic_params)
         total_supplies = supplies_result.scalar() or 0
         
         # ==================== Get Total Doctors ====================
-        doctors_query = select(func.count(User.id)).filter(
-            and_(
-                User.clinic_id == current_user.clinic_id,
-                User.role == UserRole.DOCTOR,
-                User.is_active == True
-            )
-        )
-        doctors_result = await db.execute(doctors_query)
+        doctors_result = await db.execute(_ACTIVE_DOCTORS_COUNT_STMT, clinic_params)
         total_doctors = doctors_result.scalar() or 0
         
         # ==================== Get Total Products (Service Items) ====================
-        products_query = select(func.count(ServiceItem.id)).filter(
-            and_(
-                ServiceItem.clinic_id == current_user.clinic_id,
-                ServiceItem.is_active == True
-            )
-        )
-        products_result = await db.execute(products_query)
+        products_result = await db.execute(_ACTIVE_SERVICE_ITEMS_COUNT_STMT, clinic_params)
         total_products = products_result.scalar() or 0
         
         # ==================== Get Total Payment Methods ====================
-        # PaymentMethod is an enum, so we count distinct payment methods used in payments
-        # Payment doesn't have clinic_id directly, so we join with Invoice
-        payment_methods_query = select(func.count(func.distinct(Payment.method))).join(
-            Invoice, Payment.invoice_id == Invoice.id
-        ).filter(
-            Invoice.clinic_id == current_user.clinic_id
-        )
-        payment_methods_result = await db.execute(payment_methods_query)
-        total_payment_methods = payment_methods_result.scalar() or 0
-        
-        # If no payments exist, return a default count (common payment methods)
-        if total_payment_methods == 0:
-            total_payment_methods = 5  # Default: cash, credit, debit, pix, insurance
+        # PaymentMethod is a fixed enum, so the available methods are known
+        # statically and don't need a DISTINCT + JOIN over payments
+        total_payment_methods = len(PaymentMethod)
         
         # ==================== Calculate Totals ====================
         total_registrations = total_patients + total_supplies + total_doctors + total_products + total_payment_methods
@@ -321,42 +334,12 @@ async def get_registration_stats(
         
         # ==================== Get Today's Updates ====================
         # Count records updated today (patients, products, service items, users)
-        today_patients_query = select(func.count(Patient.id)).filter(
-            and_(
-                Patient.clinic_id == current_user.clinic_id,
-                Patient.updated_at >= today_start
-            )
-        )
-        today_patients_result = await db.execute(today_patients_query)
-        today_patients = today_patients_result.scalar() or 0
-        
-        today_products_query = select(func.count(Product.id)).filter(
-            and_(
-                Product.clinic_id == current_user.clinic_id,
-                Product.updated_at >= today_start
-            )
-        )
-        today_products_result = await db.execute(today_products_query)
-        today_products = today_products_result.scalar() or 0
-        
-        today_service_items_query = select(func.count(ServiceItem.id)).filter(
-            and_(
-                ServiceItem.clinic_id == current_user.clinic_id,
-                ServiceItem.updated_at >= today_start
-            )
-        )
-        today_service_items_result = await db.execute(today_service_items_query)
-        today_service_items = today_service_items_result.scalar() or 0
-        
-        today_users_query = select(func.count(User.id)).filter(
-            and_(
-                User.clinic_id == current_user.clinic_id,
-                User.role == UserRole.DOCTOR,
-                User.updated_at >= today_start
-            )
-        )
-        today_users_result = await db.execute(today_users_query)
-        today_users = today_users_result.scalar() or 0
+        today_updates_result = await db.execute(_TODAY_UPDATES_STMT, today_params)
+        today_row = today_updates_result.one()
+        today_patients = today_row.patients or 0
+        today_products = today_row.products or 0
+        today_service_items = today_row.service_items or 0
+        today_users = today_row.doctors or 0
         
         today_updates = today_patients + today_products + today_service_items + today_users
         
@@ -371,9 +354,7 @@ async def get_registration_stats(
             today_updates=today_updates
         )
         
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+    except SQLAlchemyError as e:
         logger.error(f"Error in get_registration_stats: {str(e)}", exc_info=True)
         
         # Return default values on error
@@ -433,9 +414,7 @@ async def get_tasks(
             for task in tasks
         ]
         
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+    except SQLAlchemyError as e:
         error_msg = str(e)
         logger.error(f"Error in get_tasks: {error_msg}", exc_info=True)
         
@@ -515,9 +494,7 @@ async def create_task(
             updated_at=new_task.updated_at
         )
         
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+    except SQLAlchemyError as e:
         error_msg = str(e)
         logger.error(f"Error in create_task: {error_msg}", exc_info=True)
         await db.rollback()
@@ -601,11 +578,7 @@ async def update_task(
             updated_at=task.updated_at
         )
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+    except SQLAlchemyError as e:
         logger.error(f"Error in update_task: {str(e)}", exc_info=True)
         await db.rollback()
         raise HTTPException(
@@ -642,11 +615,7 @@ async def delete_task(
         
         return None
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+    except SQLAlchemyError as e:
         logger.error(f"Error in delete_task: {str(e)}", exc_info=True)
         await db.rollback()
         raise HTTPException(
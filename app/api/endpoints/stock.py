@@ -3,15 +3,21 @@ Stock/Inventory Management API Endpoints
 Handles product management, stock movements, and inventory tracking
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, and_, or_, func, desc, case, true, insert, update, cast, Float, literal_column
+from sqlalchemy.orm import selectinload, joinedload, aliased
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+import hashlib
+import json
+import secrets
 
-from app.core.auth import get_current_user
-from database import get_async_session
+from app.core.auth import get_current_user, RoleChecker
+from app.core.cache import cache_manager
+from app.core.http_cache import not_modified
+from database import get_async_session, AsyncSessionLocal
 from app.models import (
     User, Product, StockMovement, StockAlert, ProductCategory, 
     StockMovementType, StockMovementReason, UserRole
@@ -23,35 +29,120 @@ from app.schemas.stock import (
     StockAlertResponse, StockSummary, LowStockProduct, StockMovementSummary
 )
 
-router = APIRouter(prefix="/stock", tags=["Stock/Inventory"])
+router = APIRouter(prefix="/stock", tags=["Stock/Inventory"], default_response_class=ORJSONResponse)
+
+# Role checker for inventory writes (admin or secretary)
+require_inventory_staff = RoleChecker([UserRole.ADMIN, UserRole.SECRETARY])
+
+# Dashboards poll these read endpoints frequently; cache per clinic briefly
+# and drop the entries whenever stock or products change.
+STOCK_CACHE_TTL = 30  # seconds
+
+
+def _stock_summary_cache_key(clinic_id: int) -> str:
+    return f"stock:summary:{clinic_id}"
+
+
+def _low_stock_cache_key(clinic_id: int) -> str:
+    return f"stock:lowstock:{clinic_id}"
+
+
+def _products_cache_key(clinic_id: int) -> str:
+    return f"stock:products:{clinic_id}"
+
+
+def _stock_version_key(clinic_id: int) -> str:
+    return f"stock:ver:{clinic_id}"
+
+
+# The version is a random token rather than a counter, so a lost or expired
+# key can never bring back a version (and ETag) clients have already seen
+STOCK_VERSION_TTL = 7 * 24 * 3600  # seconds
+
+
+def _new_stock_version() -> str:
+    return secrets.token_hex(8)
+
+
+async def invalidate_stock_cache(clinic_id: int) -> None:
+    """Drop cached stock summary, low-stock and product list for a clinic"""
+    await cache_manager.delete(
+        _stock_summary_cache_key(clinic_id),
+        _low_stock_cache_key(clinic_id),
+        _products_cache_key(clinic_id),
+    )
+    # Replace the clinic's stock version so outstanding ETags stop matching
+    await cache_manager.set(
+        _stock_version_key(clinic_id), _new_stock_version(), ttl=STOCK_VERSION_TTL
+    )
+
+
+async def _stock_etag(clinic_id: int, resource: str) -> Optional[str]:
+    """
+    Weak ETag for a stock resource, derived from the clinic's stock version
+    token in Redis (created on first use). Returns None when the version
+    can't be read, e.g. Redis is unavailable.
+    """
+    version = await cache_manager.set_if_absent(
+        _stock_version_key(clinic_id), _new_stock_version(), ttl=STOCK_VERSION_TTL
+    )
+    if version is None:
+        return None
+    resource_hash = hashlib.md5(resource.encode()).hexdigest()[:12]
+    return f'W/"{clinic_id}-{version}-{resource_hash}"'
+
+
+def _summary_etag(clinic_id: int, summary: dict) -> str:
+    """
+    Weak ETag over the summary values themselves. Unlike the version token
+    it also changes with time-dependent figures (the rolling 7-day movement
+    count) and never outlives the cached body
+    """
+    digest = hashlib.md5(json.dumps(summary, sort_keys=True).encode()).hexdigest()[:16]
+    return f'W/"{clinic_id}-summary-{digest}"'
+
+
+# Stock status values shared by the SQL projection and _get_stock_status
+STOCK_STATUS_OUT = "out_of_stock"
+STOCK_STATUS_LOW = "low"
+STOCK_STATUS_NORMAL = "normal"
+
+# Stock status computed in SQL alongside the product row, so list reads
+# never evaluate it per row in Python
+_STOCK_STATUS_COLUMN = case(
+    (Product.current_stock == 0, STOCK_STATUS_OUT),
+    (Product.current_stock <= Product.min_stock, STOCK_STATUS_LOW),
+    else_=STOCK_STATUS_NORMAL
+).label("stock_status")
+
+# Search document for products; must match the expression of the
+# ix_products_search_trgm GIN index (pg_trgm) for the planner to use it
+_PRODUCT_SEARCH_DOCUMENT = literal_column(
+    "lower(coalesce(products.name, '') || ' ' || coalesce(products.description, '')"
+    " || ' ' || coalesce(products.supplier, ''))"
+)
 
 # ==================== Products ====================
 
 @router.post("/products", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_in: ProductCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_inventory_staff),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
     Create a new product
     Requires staff role (admin or secretary)
     """
-    # Check if user has permission
-    if current_user.role not in [UserRole.ADMIN, UserRole.SECRETARY]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only staff can create products"
-        )
     # Check if barcode already exists
     if product_in.barcode:
         existing_product = await db.execute(
-            select(Product).filter(
+            select(1).where(
                 Product.barcode == product_in.barcode,
                 Product.clinic_id == current_user.clinic_id
-            )
+            ).limit(1)
         )
-        if existing_product.scalar_one_or_none():
+        if existing_product.first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Product with this barcode already exists"
@@ -63,17 +154,16 @@ async def create_product(
     )
     db.add(db_product)
     await db.commit()
-    await db.refresh(db_product)
+    await invalidate_stock_cache(current_user.clinic_id)
     
-    # Add stock status
-    product_data = db_product.__dict__.copy()
-    product_data['stock_status'] = _get_stock_status(db_product.current_stock, db_product.min_stock)
-    product_response = ProductResponse.model_validate(product_data)
-    
-    return product_response
+    return _to_product_response(
+        db_product, _get_stock_status(db_product.current_stock, db_product.min_stock)
+    )
 
 @router.get("/products", response_model=List[ProductResponse])
 async def get_products(
+    request: Request,
+    response: Response,
     category: Optional[ProductCategory] = Query(None, description="Filter by category"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     low_stock: Optional[bool] = Query(None, description="Show only low stock products"),
@@ -83,8 +173,22 @@ async def get_products(
 ):
     """
     Get list of products
+    Supports If-None-Match revalidation against the returned ETag
     """
-    query = select(Product).filter(Product.clinic_id == current_user.clinic_id)
+    etag = await _stock_etag(current_user.clinic_id, f"products?{request.url.query}")
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    if etag:
+        response.headers["ETag"] = etag
+    
+    # Only the unfiltered listing is cached; filtered queries vary too much
+    is_unfiltered = category is None and is_active is None and not low_stock and not search
+    if is_unfiltered:
+        cached = await cache_manager.get(_products_cache_key(current_user.clinic_id))
+        if cached is not None:
+            return cached
+    
+    query = select(Product, _STOCK_STATUS_COLUMN).filter(Product.clinic_id == current_user.clinic_id)
     
     if category:
         query = query.filter(Product.category == category)
@@ -92,7 +196,10 @@ async def get_products(
         query = query.filter(Product.is_active == is_active)
     if low_stock:
         query = query.filter(Product.current_stock <= Product.min_stock)
-    if search:
+    if search and len(search) >= 3:
+        # Trigram index serves substring matches of 3+ characters
+        query = query.filter(_PRODUCT_SEARCH_DOCUMENT.like(f"%{search.lower()}%"))
+    elif search:
         query = query.filter(
             or_(
                 Product.name.ilike(f"%{search}%"),
@@ -103,15 +210,18 @@ async def get_products(
     
     query = query.order_by(Product.name)
     result = await db.execute(query)
-    products = result.scalars().all()
     
-    # Add stock status to each product
-    product_responses = []
-    for product in products:
-        product_data = product.__dict__.copy()
-        product_data['stock_status'] = _get_stock_status(product.current_stock, product.min_stock)
-        product_response = ProductResponse.model_validate(product_data)
-        product_responses.append(product_response)
+    product_responses = [
+        _to_product_response(product, stock_status)
+        for product, stock_status in result.all()
+    ]
+    
+    if is_unfiltered:
+        await cache_manager.set(
+            _products_cache_key(current_user.clinic_id),
+            [p.model_dump(mode="json") for p in product_responses],
+            STOCK_CACHE_TTL
+        )
     
     return product_responses
 
@@ -124,32 +234,35 @@ async def get_product(
     """
     Get a specific product with recent movements
     """
-    product_query = select(Product).filter(
+    # Product and its 10 most recent movements in one round-trip via a
+    # LEFT JOIN LATERAL (one row per movement, or a single row with no movement)
+    recent_movements = select(StockMovement).where(
+        StockMovement.product_id == Product.id
+    ).order_by(desc(StockMovement.timestamp)).limit(10).lateral("recent_movements")
+    recent_movement = aliased(StockMovement, recent_movements)
+    
+    product_query = select(Product, _STOCK_STATUS_COLUMN, recent_movement).outerjoin(
+        recent_movements, true()
+    ).filter(
         Product.id == product_id,
         Product.clinic_id == current_user.clinic_id
-    )
+    ).order_by(desc(recent_movement.timestamp))
     product_result = await db.execute(product_query)
-    product = product_result.scalar_one_or_none()
+    rows = product_result.all()
     
-    if not product:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    
-    # Get recent movements
-    movements_query = select(StockMovement).filter(
-        StockMovement.product_id == product_id
-    ).order_by(desc(StockMovement.timestamp)).limit(10)
-    
-    movements_result = await db.execute(movements_query)
-    movements = movements_result.scalars().all()
+    product, stock_status, _ = rows[0]
+    movements = [movement for _, _, movement in rows if movement is not None]
     
     # Build response
     product_response = ProductWithMovements.model_validate(product)
-    product_response.stock_status = _get_stock_status(product.current_stock, product.min_stock)
+    product_response.stock_status = stock_status
     product_response.recent_movements = [
-        StockMovementResponse.model_validate(movement) for movement in movements
+        _to_movement_response(movement) for movement in movements
     ]
     
     return product_response
@@ -158,19 +271,13 @@ async def get_product(
 async def update_product(
     product_id: int,
     product_in: ProductUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_inventory_staff),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
     Update a product
     Requires staff role
     """
-    # Check if user has permission
-    if current_user.role not in [UserRole.ADMIN, UserRole.SECRETARY]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only staff can update products"
-        )
     product_query = select(Product).filter(
         Product.id == product_id,
         Product.clinic_id == current_user.clinic_id
@@ -187,13 +294,13 @@ async def update_product(
     # Check barcode uniqueness if being updated
     if product_in.barcode and product_in.barcode != product.barcode:
         existing_product = await db.execute(
-            select(Product).filter(
+            select(1).where(
                 Product.barcode == product_in.barcode,
                 Product.clinic_id == current_user.clinic_id,
                 Product.id != product_id
-            )
+            ).limit(1)
         )
-        if existing_product.scalar_one_or_none():
+        if existing_product.first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Product with this barcode already exists"
@@ -205,18 +312,16 @@ async def update_product(
         setattr(product, field, value)
     
     await db.commit()
-    await db.refresh(product)
+    await invalidate_stock_cache(current_user.clinic_id)
     
-    product_data = product.__dict__.copy()
-    product_data['stock_status'] = _get_stock_status(product.current_stock, product.min_stock)
-    product_response = ProductResponse.model_validate(product_data)
-    
-    return product_response
+    return _to_product_response(
+        product, _get_stock_status(product.current_stock, product.min_stock)
+    )
 
 @router.delete("/products/{product_id}")
 async def delete_product(
     product_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_inventory_staff),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -226,12 +331,6 @@ async def delete_product(
     from sqlalchemy import text
     from app.models.procedure import ProcedureProduct
     
-    # Check if user has permission
-    if current_user.role not in [UserRole.ADMIN, UserRole.SECRETARY]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only staff can delete products"
-        )
     
     # Verify product exists and belongs to user's clinic
     product_query = select(Product).filter(
@@ -273,6 +372,7 @@ async def delete_product(
         # 4. Finally, delete the product itself
         await db.delete(product)
         await db.commit()
+        await invalidate_stock_cache(current_user.clinic_id)
         
         return {"message": "Product deleted successfully"}
     
@@ -288,34 +388,57 @@ async def delete_product(
 @router.post("/stock-movements", response_model=StockMovementResponse, status_code=status.HTTP_201_CREATED)
 async def create_stock_movement(
     movement_in: StockMovementCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_inventory_staff),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
     Create a new stock movement
     Requires staff role
     """
-    # Check if user has permission
-    if current_user.role not in [UserRole.ADMIN, UserRole.SECRETARY]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only staff can create stock movements"
-        )
-    # Verify product exists and belongs to clinic
-    product_query = select(Product).filter(
+    # Apply the stock change atomically: one UPDATE ... RETURNING, with the
+    # sufficiency check in the WHERE clause so concurrent OUT movements
+    # can't oversell between a read and a write
+    stock_update = update(Product).where(
         Product.id == movement_in.product_id,
         Product.clinic_id == current_user.clinic_id
     )
-    product_result = await db.execute(product_query)
-    product = product_result.scalar_one_or_none()
+    if movement_in.type == StockMovementType.IN:
+        stock_update = stock_update.values(current_stock=Product.current_stock + movement_in.quantity)
+    elif movement_in.type == StockMovementType.OUT:
+        stock_update = stock_update.where(
+            Product.current_stock >= movement_in.quantity
+        ).values(current_stock=Product.current_stock - movement_in.quantity)
+    elif movement_in.type == StockMovementType.ADJUSTMENT:
+        stock_update = stock_update.values(current_stock=movement_in.quantity)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid movement type: {movement_in.type.value}. Must be 'in', 'out', or 'adjustment'"
+        )
     
-    if not product:
+    stock_result = await db.execute(
+        stock_update.returning(Product.current_stock).execution_options(synchronize_session=False)
+    )
+    if stock_result.scalar_one_or_none() is None:
+        # No row updated: either the product doesn't exist in this clinic
+        # or an OUT movement exceeds the available stock
+        product_exists = await db.execute(
+            select(1).where(
+                Product.id == movement_in.product_id,
+                Product.clinic_id == current_user.clinic_id
+            ).limit(1)
+        )
+        if product_exists.first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Insufficient stock"
         )
     
-    # Create movement
+    # Create movement in the same transaction
     db_movement = StockMovement(
         clinic_id=current_user.clinic_id,
         created_by=current_user.id,
@@ -323,56 +446,97 @@ async def create_stock_movement(
     )
     db.add(db_movement)
     
-    # Update product stock
-    # Get the string value of the movement type (handles both enum and string)
-    try:
-        movement_type_str = movement_in.type.value if hasattr(movement_in.type, 'value') else str(movement_in.type)
-    except:
-        movement_type_str = str(movement_in.type)
-    movement_type_str = movement_type_str.lower()
-    
-    if movement_type_str == "in":
-        product.current_stock += movement_in.quantity
-    elif movement_type_str == "out":
-        if product.current_stock < movement_in.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Insufficient stock"
-            )
-        product.current_stock -= movement_in.quantity
-    elif movement_type_str == "adjustment":
-        product.current_stock = movement_in.quantity
-    else:
-        # Log for debugging
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Invalid stock movement type received: {movement_type_str} (original: {movement_in.type}, type: {type(movement_in.type)})")
+    await db.commit()
+    await invalidate_stock_cache(current_user.clinic_id)
+    
+    return _to_movement_response(db_movement)
+
+@router.post("/stock-movements/bulk", response_model=List[StockMovementResponse], status_code=status.HTTP_201_CREATED)
+async def create_stock_movements_bulk(
+    movements_in: List[StockMovementCreate],
+    current_user: User = Depends(require_inventory_staff),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Create many stock movements at once (e.g. CSV import)
+    Movements are applied in order; one INSERT for all movements and one
+    batched UPDATE for the affected products, in a single transaction.
+    Requires staff role
+    """
+    if not movements_in:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid movement type: {movement_type_str}. Must be 'in', 'out', or 'adjustment'"
+            detail="No stock movements provided"
+        )
+    
+    # Load (and lock) current stock for every referenced product in one query
+    product_ids = {movement_in.product_id for movement_in in movements_in}
+    stock_result = await db.execute(
+        select(Product.id, Product.current_stock).where(
+            Product.id.in_(product_ids),
+            Product.clinic_id == current_user.clinic_id
+        ).with_for_update()
+    )
+    new_stock = dict(stock_result.all())
+    missing = product_ids - new_stock.keys()
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product not found: {', '.join(str(pid) for pid in sorted(missing))}"
         )
     
+    # Apply movements in order so OUT checks see earlier movements in the batch
+    for movement_in in movements_in:
+        if movement_in.type == StockMovementType.IN:
+            new_stock[movement_in.product_id] += movement_in.quantity
+        elif movement_in.type == StockMovementType.OUT:
+            if new_stock[movement_in.product_id] < movement_in.quantity:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Insufficient stock for product {movement_in.product_id}"
+                )
+            new_stock[movement_in.product_id] -= movement_in.quantity
+        elif movement_in.type == StockMovementType.ADJUSTMENT:
+            new_stock[movement_in.product_id] = movement_in.quantity
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid movement type: {movement_in.type.value}. Must be 'in', 'out', or 'adjustment'"
+            )
+    
+    movements_result = await db.execute(
+        insert(StockMovement).returning(StockMovement),
+        [
+            {
+                **movement_in.model_dump(),
+                "clinic_id": current_user.clinic_id,
+                "created_by": current_user.id,
+            }
+            for movement_in in movements_in
+        ]
+    )
+    movements = movements_result.scalars().all()
+    
+    await db.execute(
+        update(Product),
+        [{"id": product_id, "current_stock": stock} for product_id, stock in new_stock.items()]
+    )
+    
     await db.commit()
-    await db.refresh(db_movement)
+    await invalidate_stock_cache(current_user.clinic_id)
     
-    return StockMovementResponse.model_validate(db_movement)
+    return [_to_movement_response(movement) for movement in movements]
 
 @router.post("/stock-movements/adjustment", response_model=StockAdjustmentResponse)
 async def adjust_stock(
     adjustment_in: StockAdjustmentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_inventory_staff),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
     Manually adjust stock for a product
     Requires staff role
     """
-    # Check if user has permission
-    if current_user.role not in [UserRole.ADMIN, UserRole.SECRETARY]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only staff can adjust stock"
-        )
     # Get product
     product_query = select(Product).filter(
         Product.id == adjustment_in.product_id,
@@ -407,7 +571,7 @@ async def adjust_stock(
     product.current_stock = adjustment_in.new_quantity
     
     await db.commit()
-    await db.refresh(movement)
+    await invalidate_stock_cache(current_user.clinic_id)
     
     return StockAdjustmentResponse(
         product_id=product.id,
@@ -426,10 +590,11 @@ async def get_stock_movements(
     end_date: Optional[datetime] = Query(None, description="Filter by end date"),
     limit: int = Query(100, le=1000, description="Limit number of results"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
 ):
     """
     Get stock movements with optional filters
+    Rows are streamed from a server-side cursor as a JSON array, so the
+    first bytes go out before the whole result is fetched.
     """
     query = select(StockMovement).filter(
         StockMovement.clinic_id == current_user.clinic_id
@@ -444,11 +609,23 @@ async def get_stock_movements(
     if end_date:
         query = query.filter(StockMovement.timestamp <= end_date)
     
-    query = query.order_by(desc(StockMovement.timestamp)).limit(limit)
-    result = await db.execute(query)
-    movements = result.scalars().all()
-    
-    return [StockMovementResponse.model_validate(movement) for movement in movements]
+    query = query.order_by(desc(StockMovement.timestamp)).limit(limit).execution_options(yield_per=200)
+    
+    async def stream_movements():
+        # The request-scoped session is closed before a streaming body is
+        # sent, so the cursor needs a session owned by the generator
+        async with AsyncSessionLocal() as session:
+            result = await session.stream_scalars(query)
+            yield b"["
+            first = True
+            async for movement in result:
+                if not first:
+                    yield b","
+                first = False
+                yield _to_movement_response(movement).model_dump_json().encode()
+            yield b"]"
+    
+    return StreamingResponse(stream_movements(), media_type="application/json")
 
 @router.get("/stock-movements/low-stock", response_model=List[LowStockProduct])
 async def get_low_stock_products(
@@ -458,6 +635,10 @@ async def get_low_stock_products(
     """
     Get products that are below their minimum stock level
     """
+    cached = await cache_manager.get(_low_stock_cache_key(current_user.clinic_id))
+    if cached is not None:
+        return cached
+    
     query = select(Product).filter(
         Product.clinic_id == current_user.clinic_id,
         Product.is_active == True,
@@ -484,86 +665,127 @@ async def get_low_stock_products(
             days_until_out=days_until_out
         ))
     
+    await cache_manager.set(
+        _low_stock_cache_key(current_user.clinic_id),
+        [p.model_dump(mode="json") for p in low_stock_products],
+        STOCK_CACHE_TTL
+    )
+    
     return low_stock_products
 
 # ==================== Dashboard/Summary ====================
 
 @router.get("/dashboard/summary", response_model=StockSummary)
 async def get_stock_summary(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
     Get stock dashboard summary
+    Supports If-None-Match revalidation against the returned ETag
     """
-    # Total products
-    total_products_query = select(func.count(Product.id)).filter(
-        Product.clinic_id == current_user.clinic_id,
-        Product.is_active == True
-    )
-    total_products_result = await db.execute(total_products_query)
-    total_products = total_products_result.scalar()
-    
-    # Low stock products
-    low_stock_query = select(func.count(Product.id)).filter(
-        Product.clinic_id == current_user.clinic_id,
-        Product.is_active == True,
-        Product.current_stock <= Product.min_stock,
-        Product.current_stock > 0
-    )
-    low_stock_result = await db.execute(low_stock_query)
-    low_stock_products = low_stock_result.scalar()
-    
-    # Out of stock products
-    out_of_stock_query = select(func.count(Product.id)).filter(
-        Product.clinic_id == current_user.clinic_id,
-        Product.is_active == True,
-        Product.current_stock == 0
-    )
-    out_of_stock_result = await db.execute(out_of_stock_query)
-    out_of_stock_products = out_of_stock_result.scalar()
-    
-    # Total value
-    total_value_query = select(func.sum(Product.current_stock * Product.unit_price)).filter(
-        Product.clinic_id == current_user.clinic_id,
-        Product.is_active == True,
-        Product.unit_price.isnot(None)
-    )
-    total_value_result = await db.execute(total_value_query)
-    total_value = total_value_result.scalar() or 0.0
-    
-    # Recent movements (last 7 days)
-    recent_movements_query = select(func.count(StockMovement.id)).filter(
+    cached = await cache_manager.get(_stock_summary_cache_key(current_user.clinic_id))
+    if cached is not None:
+        etag = _summary_etag(current_user.clinic_id, cached)
+        if not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return StockSummary(**cached)
+    
+    # All aggregates in a single round-trip: conditional counts over active
+    # products plus scalar subqueries for recent movements and pending alerts
+    recent_movements_subquery = select(func.count()).select_from(StockMovement).where(
         StockMovement.clinic_id == current_user.clinic_id,
-        StockMovement.timestamp >= datetime.now() - timedelta(days=7)
-    )
-    recent_movements_result = await db.execute(recent_movements_query)
-    recent_movements = recent_movements_result.scalar()
-    
-    # Pending alerts
-    pending_alerts_query = select(func.count(StockAlert.id)).filter(
+        # Evaluated by Postgres so the statement text is constant across requests
+        StockMovement.timestamp >= func.now() - literal_column("INTERVAL '7 days'")
+    ).scalar_subquery()
+    pending_alerts_subquery = select(func.count()).select_from(StockAlert).where(
         StockAlert.clinic_id == current_user.clinic_id,
         StockAlert.is_resolved == False
+    ).scalar_subquery()
+    
+    summary_query = select(
+        func.count().label("total_products"),
+        func.count().filter(
+            and_(Product.current_stock <= Product.min_stock, Product.current_stock > 0)
+        ).label("low_stock_products"),
+        func.count().filter(Product.current_stock == 0).label("out_of_stock_products"),
+        # Cast to float8 in SQL so the driver decodes a float, not a Decimal
+        func.coalesce(func.sum(cast(Product.current_stock * Product.unit_price, Float)), 0.0).label("total_value"),
+        recent_movements_subquery.label("recent_movements"),
+        pending_alerts_subquery.label("pending_alerts"),
+    ).select_from(Product).where(
+        Product.clinic_id == current_user.clinic_id,
+        Product.is_active == True
     )
-    pending_alerts_result = await db.execute(pending_alerts_query)
-    pending_alerts = pending_alerts_result.scalar()
+    summary_result = await db.execute(summary_query)
+    row = summary_result.one()
+    
+    total_products = row.total_products
+    low_stock_products = row.low_stock_products
+    out_of_stock_products = row.out_of_stock_products
+    total_value = row.total_value
+    recent_movements = row.recent_movements
+    pending_alerts = row.pending_alerts
     
-    return StockSummary(
+    summary = StockSummary(
         total_products=total_products,
         low_stock_products=low_stock_products,
         out_of_stock_products=out_of_stock_products,
-        total_value=float(total_value),
+        total_value=total_value,
         recent_movements=recent_movements,
         pending_alerts=pending_alerts
     )
+    payload = summary.model_dump(mode="json")
+    await cache_manager.set(
+        _stock_summary_cache_key(current_user.clinic_id),
+        payload,
+        STOCK_CACHE_TTL
+    )
+    
+    etag = _summary_etag(current_user.clinic_id, payload)
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return summary
 
 # ==================== Helper Functions ====================
 
 def _get_stock_status(current_stock: int, min_stock: int) -> str:
-    """Get stock status based on current and minimum stock"""
+    """Get stock status for a single row already in memory (write paths)"""
     if current_stock == 0:
-        return "out_of_stock"
-    elif current_stock <= min_stock:
-        return "low"
-    else:
-        return "normal"
+        return STOCK_STATUS_OUT
+    if current_stock <= min_stock:
+        return STOCK_STATUS_LOW
+    return STOCK_STATUS_NORMAL
+
+
+# Response fields read straight off the ORM rows, computed once at import
+# (stock_status / product_name / creator_name are not model attributes)
+_PRODUCT_FIELDS = tuple(f for f in ProductResponse.model_fields if f != "stock_status")
+_MOVEMENT_FIELDS = tuple(
+    f for f in StockMovementResponse.model_fields if f not in ("product_name", "creator_name")
+)
+
+
+def _to_product_response(product: Product, stock_status: str) -> ProductResponse:
+    """
+    Build a ProductResponse from a loaded Product row without re-validating.
+    Data comes straight from the database, so model_construct is safe and
+    avoids copying the instance __dict__ (including SQLAlchemy state).
+    """
+    data = {field: getattr(product, field) for field in _PRODUCT_FIELDS}
+    if data["unit_price"] is not None:
+        data["unit_price"] = float(data["unit_price"])
+    return ProductResponse.model_construct(**data, stock_status=stock_status)
+
+
+def _to_movement_response(movement: StockMovement) -> StockMovementResponse:
+    """Build a StockMovementResponse from a loaded StockMovement row without re-validating"""
+    data = {field: getattr(movement, field) for field in _MOVEMENT_FIELDS}
+    for field in ("unit_cost", "total_cost"):
+        if data[field] is not None:
+            data[field] = float(data[field])
+    return StockMovementResponse.model_construct(**data)
@@ -1,15 +1,18 @@
 """
 Support Ticket and Help Article API Endpoints
 """
+import hashlib
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, update, and_, or_, func
 from sqlalchemy.orm import selectinload
-import json
 
 from database import get_async_session
 from app.core.auth import get_current_user, require_staff
+from app.core.cache import cache_manager
+from app.services.help_article_views import record_article_view
 from app.models import User, UserRole, Patient
 from app.models.support import SupportTicket, HelpArticle, TicketStatus, TicketPriority
 from app.schemas.support import (
@@ -21,20 +24,56 @@ from app.schemas.support import (
     HelpArticleResponse,
 )
 
-router = APIRouter(prefix="/support", tags=["Support"])
+router = APIRouter(prefix="/support", tags=["Support"], default_response_class=ORJSONResponse)
 
 
-async def get_patient_from_user(current_user: User, db: AsyncSession) -> Optional[Patient]:
-    """Helper to get patient record from user"""
-    from sqlalchemy import select, and_
-    patient_query = select(Patient).filter(
+PATIENT_ID_CACHE_TTL = 300  # 5 minutes
+ARTICLE_CATEGORIES_CACHE_TTL = 600  # 10 minutes; articles are only managed outside the API
+
+
+def _patient_by_user_cache_key(user: User) -> str:
+    # Keyed by everything the lookup matches on, so a changed email or clinic
+    # misses instead of serving the old patient (hashed to keep emails out of keys)
+    email_hash = hashlib.md5((user.email or "").lower().encode()).hexdigest()[:16]
+    return f"patient_by_user:{user.id}:{user.clinic_id}:{email_hash}"
+
+
+def _article_categories_cache_key(clinic_id: Optional[int]) -> str:
+    return f"help_articles:categories:{clinic_id}"
+
+
+async def get_patient_id_from_user(current_user: User, db: AsyncSession) -> Optional[int]:
+    """Resolve the patient record id for a user, memoized in Redis by user, clinic and email"""
+    cache_key = _patient_by_user_cache_key(current_user)
+    cached = await cache_manager.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    patient_query = select(Patient.id).filter(
         and_(
-            Patient.email == current_user.email,
-            Patient.clinic_id == current_user.clinic_id
+            Patient.clinic_id == current_user.clinic_id,
+            func.lower(Patient.email) == (current_user.email or "").lower()
         )
     )
-    patient_result = await db.execute(patient_query)
-    return patient_result.scalar_one_or_none()
+    # The lower(email) index is not unique; pick one match deterministically
+    patient_result = await db.execute(patient_query.order_by(Patient.id).limit(1))
+    patient_id = patient_result.scalars().first()
+    if patient_id is not None:
+        await cache_manager.set(cache_key, patient_id, PATIENT_ID_CACHE_TTL)
+    return patient_id
+
+
+async def get_current_patient_id(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+) -> Optional[int]:
+    """
+    Dependency resolving the current user's patient id once per request.
+    Non-patient users resolve to None without touching the database.
+    """
+    if current_user.role != UserRole.PATIENT:
+        return None
+    return await get_patient_id_from_user(current_user, db)
 
 
 # ==================== Support Tickets ====================
@@ -43,7 +82,10 @@ async def get_patient_from_user(current_user: User, db: AsyncSession) -> Optiona
 async def get_my_tickets(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
+    patient_id: Optional[int] = Depends(get_current_patient_id),
     status_filter: Optional[TicketStatus] = Query(None, alias="status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
 ):
     """
     Get current patient's support tickets
@@ -54,13 +96,12 @@ async def get_my_tickets(
             detail="This endpoint is only available for patients"
         )
     
-    patient = await get_patient_from_user(current_user, db)
-    if not patient:
+    if patient_id is None:
         return []
     
     query = select(SupportTicket).filter(
         and_(
-            SupportTicket.patient_id == patient.id,
+            SupportTicket.patient_id == patient_id,
             SupportTicket.clinic_id == current_user.clinic_id,
             SupportTicket.is_active == True
         )
@@ -69,7 +110,7 @@ async def get_my_tickets(
     if status_filter:
         query = query.filter(SupportTicket.status == status_filter)
     
-    query = query.order_by(SupportTicket.created_at.desc())
+    query = query.order_by(SupportTicket.created_at.desc()).offset(skip).limit(limit)
     
     result = await db.execute(query)
     tickets = result.scalars().all()
@@ -82,6 +123,7 @@ async def create_ticket(
     ticket_data: SupportTicketCreate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
+    patient_id: Optional[int] = Depends(get_current_patient_id),
 ):
     """
     Create a new support ticket
@@ -92,15 +134,14 @@ async def create_ticket(
             detail="This endpoint is only available for patients"
         )
     
-    patient = await get_patient_from_user(current_user, db)
-    if not patient:
+    if patient_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient profile not found"
         )
     
     ticket = SupportTicket(
-        patient_id=patient.id,
+        patient_id=patient_id,
         clinic_id=current_user.clinic_id,
         subject=ticket_data.subject,
         description=ticket_data.description,
@@ -120,6 +161,7 @@ async def get_ticket(
     ticket_id: int,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
+    patient_id: Optional[int] = Depends(get_current_patient_id),
 ):
     """
     Get a specific support ticket
@@ -130,8 +172,7 @@ async def get_ticket(
             detail="This endpoint is only available for patients"
         )
     
-    patient = await get_patient_from_user(current_user, db)
-    if not patient:
+    if patient_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient profile not found"
@@ -140,7 +181,7 @@ async def get_ticket(
     query = select(SupportTicket).filter(
         and_(
             SupportTicket.id == ticket_id,
-            SupportTicket.patient_id == patient.id,
+            SupportTicket.patient_id == patient_id,
             SupportTicket.clinic_id == current_user.clinic_id
         )
     )
@@ -163,6 +204,7 @@ async def update_ticket(
     ticket_data: SupportTicketUpdate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
+    patient_id: Optional[int] = Depends(get_current_patient_id),
 ):
     """
     Update a support ticket (patients can only update their own tickets)
@@ -173,8 +215,7 @@ async def update_ticket(
             detail="This endpoint is only available for patients"
         )
     
-    patient = await get_patient_from_user(current_user, db)
-    if not patient:
+    if patient_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient profile not found"
@@ -183,7 +224,7 @@ async def update_ticket(
     query = select(SupportTicket).filter(
         and_(
             SupportTicket.id == ticket_id,
-            SupportTicket.patient_id == patient.id,
+            SupportTicket.patient_id == patient_id,
             SupportTicket.clinic_id == current_user.clinic_id
         )
     )
@@ -220,6 +261,9 @@ async def get_help_articles(
     db: AsyncSession = Depends(get_async_session),
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    tag: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
 ):
     """
     Get help articles (available to all authenticated users)
@@ -238,34 +282,26 @@ async def get_help_articles(
     if category:
         query = query.filter(HelpArticle.category == category)
     
+    if tag:
+        query = query.filter(HelpArticle.tags.contains([tag]))
+    
     if search:
-        search_filter = or_(
-            HelpArticle.title.ilike(f"%{search}%"),
-            HelpArticle.content.ilike(f"%{search}%"),
-            HelpArticle.tags.ilike(f"%{search}%")
+        ts_query = func.plainto_tsquery("portuguese", search)
+        query = query.filter(HelpArticle.search_vector.op("@@")(ts_query)).order_by(
+            func.ts_rank(HelpArticle.search_vector, ts_query).desc(),
+            HelpArticle.created_at.desc()
         )
-        query = query.filter(search_filter)
+    else:
+        query = query.order_by(HelpArticle.created_at.desc())
     
-    query = query.order_by(HelpArticle.created_at.desc())
+    query = query.offset(skip).limit(limit)
     
     result = await db.execute(query)
     articles = result.scalars().all()
     
-    # Parse tags from JSON string
-    article_responses = []
-    for article in articles:
-        article_dict = HelpArticleResponse.model_validate(article).model_dump()
-        # Parse tags from JSON string if exists
-        if article.tags:
-            try:
-                article_dict["tags"] = json.loads(article.tags) if isinstance(article.tags, str) else article.tags
-            except:
-                article_dict["tags"] = []
-        else:
-            article_dict["tags"] = []
-        article_responses.append(HelpArticleResponse(**article_dict))
-    
-    return article_responses
+    # response_model validates the ORM rows directly (from_attributes); building
+    # HelpArticleResponse here would only be dumped and validated again
+    return articles
 
 
 @router.get("/articles/categories", response_model=List[str])
@@ -277,6 +313,11 @@ async def get_article_categories(
     Get list of unique article categories
     Must be defined before /articles/{article_id} to ensure correct route matching
     """
+    cache_key = _article_categories_cache_key(current_user.clinic_id)
+    cached = await cache_manager.get(cache_key)
+    if cached is not None:
+        return cached
+    
     query = select(HelpArticle.category).filter(
         and_(
             HelpArticle.is_active == True,
@@ -285,12 +326,40 @@ async def get_article_categories(
                 HelpArticle.clinic_id.is_(None)
             )
         )
-    ).distinct()
+    ).distinct().order_by(HelpArticle.category)
     
     result = await db.execute(query)
-    categories = [row[0] for row in result.all()]
+    categories = list(result.scalars().all())
     
-    return sorted(categories)
+    await cache_manager.set(cache_key, categories, ARTICLE_CATEGORIES_CACHE_TTL)
+    return categories
+
+
+async def _increment_article_counter(
+    db: AsyncSession, article_id: int, clinic_id: int, counter
+) -> Optional[HelpArticle]:
+    """
+    Increment a visible article's counter with a single UPDATE ... RETURNING
+    Returns None when the article doesn't exist or isn't visible to the clinic
+    """
+    stmt = (
+        update(HelpArticle)
+        .where(
+            HelpArticle.id == article_id,
+            HelpArticle.is_active == True,
+            or_(
+                HelpArticle.clinic_id == clinic_id,
+                HelpArticle.clinic_id.is_(None)
+            )
+        )
+        .values({counter: counter + 1})
+        .returning(HelpArticle)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    article = result.scalar_one_or_none()
+    await db.commit()
+    return article
 
 
 @router.get("/articles/{article_id}", response_model=HelpArticleResponse)
@@ -322,22 +391,16 @@ async def get_help_article(
             detail="Article not found"
         )
     
-    # Increment view count
-    article.views = (article.views or 0) + 1
-    await db.commit()
-    await db.refresh(article)
-    
-    # Parse tags
-    article_dict = HelpArticleResponse.model_validate(article).model_dump()
-    if article.tags:
-        try:
-            article_dict["tags"] = json.loads(article.tags) if isinstance(article.tags, str) else article.tags
-        except:
-            article_dict["tags"] = []
-    else:
-        article_dict["tags"] = []
+    # Buffer the view in Redis; a background task flushes it to the database
+    pending_views = await record_article_view(article_id)
+    if pending_views is None:
+        # Redis unavailable: count the view directly
+        article = await _increment_article_counter(db, article_id, current_user.clinic_id, HelpArticle.views) or article
+        return HelpArticleResponse.model_validate(article)
     
-    return HelpArticleResponse(**article_dict)
+    article_response = HelpArticleResponse.model_validate(article)
+    article_response.views += pending_views
+    return article_response
 
 
 @router.post("/articles/{article_id}/helpful", response_model=HelpArticleResponse)
@@ -349,19 +412,8 @@ async def mark_article_helpful(
     """
     Mark a help article as helpful (increment helpful count)
     """
-    query = select(HelpArticle).filter(
-        and_(
-            HelpArticle.id == article_id,
-            HelpArticle.is_active == True,
-            or_(
-                HelpArticle.clinic_id == current_user.clinic_id,
-                HelpArticle.clinic_id.is_(None)
-            )
-        )
-    )
-    
-    result = await db.execute(query)
-    article = result.scalar_one_or_none()
+    # Increment helpful count atomically and return the updated row in the same statement
+    article = await _increment_article_counter(db, article_id, current_user.clinic_id, HelpArticle.helpful_count)
     
     if not article:
         raise HTTPException(
@@ -369,20 +421,5 @@ async def mark_article_helpful(
             detail="Article not found"
         )
     
-    # Increment helpful count
-    article.helpful_count = (article.helpful_count or 0) + 1
-    await db.commit()
-    await db.refresh(article)
-    
-    # Parse tags
-    article_dict = HelpArticleResponse.model_validate(article).model_dump()
-    if article.tags:
-        try:
-            article_dict["tags"] = json.loads(article.tags) if isinstance(article.tags, str) else article.tags
-        except:
-            article_dict["tags"] = []
-    else:
-        article_dict["tags"] = []
-    
-    return HelpArticleResponse(**article_dict)
+    return article
 
@@ -4,26 +4,37 @@ Provides endpoints for generating and downloading TISS standard XML files
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, func, bindparam
 
-from app.core.auth import get_current_user
-from app.models import User, Invoice, InvoiceStatus, Appointment, InvoiceLine
-from app.services.tiss_service import generate_tiss_xml, generate_batch_tiss_xml
-from app.services.tiss_validator import validate_tiss_document
+from app.core.auth import require_admin_or_secretary
+from app.models import User, Invoice
+from app.services.tiss_service import render_tiss_xml, iter_batch_tiss_zip, tiss_invoice_load_options, validate_invoice_tiss
 from database import get_async_session
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(tags=["TISS"])
 
+# Tenant-scoped invoice lookup shared by the single-invoice endpoints; built once
+# so the clinic predicate lives in one place
+_CLINIC_INVOICE_STMT = select(Invoice).options(*tiss_invoice_load_options()).where(
+    Invoice.id == bindparam("invoice_id"),
+    Invoice.clinic_id == bindparam("clinic_id")
+)
+
+
+async def _get_clinic_invoice(db: AsyncSession, invoice_id: int, clinic_id: int) -> Optional[Invoice]:
+    """Load an invoice of the given clinic with everything TISS generation reads"""
+    result = await db.execute(_CLINIC_INVOICE_STMT, {"invoice_id": invoice_id, "clinic_id": clinic_id})
+    return result.unique().scalar_one_or_none()
+
 
 @router.get("/invoices/{invoice_id}/tiss-xml")
 async def get_tiss_xml(
     invoice_id: int,
     skip_validation: bool = False,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_admin_or_secretary()),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -45,17 +56,7 @@ async def get_tiss_xml(
     
     try:
         # Verify invoice exists and user has access
-        invoice_query = select(Invoice).options(
-            joinedload(Invoice.patient),
-            joinedload(Invoice.appointment).joinedload(Appointment.doctor),
-            joinedload(Invoice.clinic),
-            joinedload(Invoice.invoice_lines).joinedload(InvoiceLine.service_item)
-        ).filter(
-            Invoice.id == invoice_id,
-            Invoice.clinic_id == current_user.clinic_id
-        )
-        invoice_result = await db.execute(invoice_query)
-        invoice = invoice_result.unique().scalar_one_or_none()
+        invoice = await _get_clinic_invoice(db, invoice_id, current_user.clinic_id)
         
         if not invoice:
             logger.warning(f"Invoice {invoice_id} not found or access denied for user {current_user.id}")
@@ -64,14 +65,6 @@ async def get_tiss_xml(
                 detail="Invoice not found or access denied"
             )
         
-        # Check if user has permission to access this invoice
-        if current_user.role not in ["admin", "secretary"]:
-            logger.warning(f"User {current_user.id} with role {current_user.role} attempted to access invoice {invoice_id}")
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Insufficient permissions to access invoice data"
-            )
-        
         # Validate invoice has required data before attempting to generate XML
         if not invoice.patient:
             logger.error(f"Invoice {invoice_id} missing patient data")
@@ -119,7 +112,7 @@ async def get_tiss_xml(
         
         # Generate TISS XML (with optional validation skip)
         logger.info(f"Generating TISS XML for invoice {invoice_id} (skip_validation={should_skip_validation})")
-        xml_content = await generate_tiss_xml(invoice_id, db, skip_validation=should_skip_validation)
+        xml_content = await render_tiss_xml(invoice, skip_validation=should_skip_validation)
         
         # Return XML file for download
         filename = f"tiss_invoice_{invoice_id:06d}.xml"
@@ -154,7 +147,7 @@ async def get_tiss_xml(
 @router.get("/invoices/{invoice_id}/tiss-xml/preview")
 async def preview_tiss_xml(
     invoice_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_admin_or_secretary()),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -170,17 +163,7 @@ async def preview_tiss_xml(
     """
     try:
         # Verify invoice exists and user has access
-        invoice_query = select(Invoice).options(
-            joinedload(Invoice.patient),
-            joinedload(Invoice.appointment).joinedload(Appointment.doctor),
-            joinedload(Invoice.clinic),
-            joinedload(Invoice.invoice_lines).joinedload(InvoiceLine.service_item)
-        ).filter(
-            Invoice.id == invoice_id,
-            Invoice.clinic_id == current_user.clinic_id
-        )
-        invoice_result = await db.execute(invoice_query)
-        invoice = invoice_result.unique().scalar_one_or_none()
+        invoice = await _get_clinic_invoice(db, invoice_id, current_user.clinic_id)
         
         if not invoice:
             raise HTTPException(
@@ -188,15 +171,8 @@ async def preview_tiss_xml(
                 detail="Invoice not found or access denied"
             )
         
-        # Check if user has permission to access this invoice
-        if current_user.role not in ["admin", "secretary"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Insufficient permissions to access invoice data"
-            )
-        
         # Generate TISS XML (skip validation for preview)
-        xml_content = await generate_tiss_xml(invoice_id, db, skip_validation=True)
+        xml_content = await render_tiss_xml(invoice, skip_validation=True)
         
         # Return XML content as text
         return Response(
@@ -219,7 +195,7 @@ async def preview_tiss_xml(
 @router.post("/invoices/batch-tiss-xml")
 async def generate_batch_tiss_xml_endpoint(
     invoice_ids: List[int],
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_admin_or_secretary()),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -234,36 +210,28 @@ async def generate_batch_tiss_xml_endpoint(
         ZIP file containing TISS XML files
     """
     try:
-        # Verify all invoices exist and user has access
-        invoice_query = select(Invoice).filter(
-            Invoice.id.in_(invoice_ids),
-            Invoice.clinic_id == current_user.clinic_id
+        # Verify all invoices exist and user has access (count only; the
+        # stream loads the full invoices in chunks)
+        unique_invoice_ids = set(invoice_ids)
+        accessible_count = await db.scalar(
+            select(func.count()).select_from(Invoice).filter(
+                Invoice.id.in_(unique_invoice_ids),
+                Invoice.clinic_id == current_user.clinic_id
+            )
         )
-        invoice_result = await db.execute(invoice_query)
-        invoices = invoice_result.scalars().all()
         
-        if len(invoices) != len(invoice_ids):
+        if accessible_count != len(unique_invoice_ids):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="One or more invoices not found or access denied"
             )
         
-        # Check if user has permission to access these invoices
-        if current_user.role not in ["admin", "secretary"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Insufficient permissions to access invoice data"
-            )
-        
-        # Generate batch TISS XML
-        zip_content = await generate_batch_tiss_xml(invoice_ids, db)
-        
-        # Return ZIP file for download
+        # Stream the ZIP as each invoice's XML is generated
         from datetime import datetime
         filename = f"tiss_batch_{len(invoice_ids)}_invoices_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
         
-        return Response(
-            content=zip_content,
+        return StreamingResponse(
+            iter_batch_tiss_zip(invoice_ids, current_user.clinic_id),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
@@ -286,7 +254,7 @@ async def generate_batch_tiss_xml_endpoint(
 @router.post("/invoices/{invoice_id}/tiss-xml/validate")
 async def validate_tiss_xml(
     invoice_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_admin_or_secretary()),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -302,17 +270,7 @@ async def validate_tiss_xml(
     """
     try:
         # Verify invoice exists and user has access
-        invoice_query = select(Invoice).options(
-            joinedload(Invoice.patient),
-            joinedload(Invoice.appointment).joinedload(Appointment.doctor),
-            joinedload(Invoice.clinic),
-            joinedload(Invoice.invoice_lines).joinedload(InvoiceLine.service_item)
-        ).filter(
-            Invoice.id == invoice_id,
-            Invoice.clinic_id == current_user.clinic_id
-        )
-        invoice_result = await db.execute(invoice_query)
-        invoice = invoice_result.unique().scalar_one_or_none()
+        invoice = await _get_clinic_invoice(db, invoice_id, current_user.clinic_id)
         
         if not invoice:
             raise HTTPException(
@@ -320,21 +278,8 @@ async def validate_tiss_xml(
                 detail="Invoice not found or access denied"
             )
         
-        # Check if user has permission to access this invoice
-        if current_user.role not in ["admin", "secretary"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Insufficient permissions to access invoice data"
-            )
-        
-        # Build TISS document structure
-        from app.services.tiss_service import _build_tiss_document
-        tiss_doc = await _build_tiss_document(invoice)
-        
-        # Validate TISS document
-        validation_result = validate_tiss_document(tiss_doc)
-        
-        return validation_result
+        # Build and validate the TISS document off the event loop
+        return await validate_invoice_tiss(invoice)
         
     except ValueError as e:
         raise HTTPException(
@@ -2,49 +2,126 @@
 TISS Configuration Endpoints
 Stores and retrieves per-clinic TISS configuration
 """
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.exc import SQLAlchemyError, ProgrammingError
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError, ProgrammingError
 from typing import Any, Dict, Optional
+from cachetools import TTLCache
 
 from app.core.auth import get_current_user
+from app.core.cache import cache_manager
 from app.middleware.permissions import require_super_admin
-from database import get_async_session
+from database import get_async_session, get_read_session
 from app.models import User
 from app.models.tiss_config import TissConfig
 
-router = APIRouter(prefix="/tiss-config", tags=["TISS Config"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/tiss-config", tags=["TISS Config"], default_response_class=ORJSONResponse)
+
+TISS_CONFIG_CACHE_TTL = 300  # 5 minutes
+# Per-process cache in front of Redis. Other workers only see a write once
+# their entry expires, so keep the TTL short.
+TISS_CONFIG_LOCAL_CACHE_TTL = 30
+_local_config_cache: TTLCache = TTLCache(maxsize=1024, ttl=TISS_CONFIG_LOCAL_CACHE_TTL)
+TISS_CONFIG_SECTIONS = ("prestador", "operadora", "defaults", "tiss")
+
+
+_DEFAULT_CONFIG = {
+    "prestador": {"cnpj": "", "nome": "", "codigo_prestador": "001"},
+    "operadora": {"cnpj": "", "nome": "Operadora Padrão", "registro_ans": "000000"},
+    "defaults": {"nome_plano": "Plano Padrão", "cbo_profissional": "2251", "hora_inicio": "08:00", "hora_fim": "09:00"},
+    "tiss": {"versao": "3.03.00", "enabled": True, "auto_generate": False},
+}
 
 
 def _defaults():
+    return {section: dict(values) for section, values in _DEFAULT_CONFIG.items()}
+
+
+def _tiss_config_cache_key(clinic_id: int) -> str:
+    return f"tiss_cfg:{clinic_id}"
+
+
+async def load_tiss_config(clinic_id: int, db: AsyncSession) -> Dict[str, Any]:
+    """
+    Return the TISS config for a clinic, served from the in-process cache or
+    Redis when cached.
+    Falls back to defaults when the clinic has no config row.
+    """
+    local = _local_config_cache.get(clinic_id)
+    if local is not None:
+        return local
+
+    cache_key = _tiss_config_cache_key(clinic_id)
+    cached = await cache_manager.get(cache_key)
+    if cached is not None:
+        _local_config_cache[clinic_id] = cached
+        return cached
+
+    try:
+        result = await db.execute(select(TissConfig).where(TissConfig.clinic_id == clinic_id))
+        cfg = result.scalar_one_or_none()
+    except (ProgrammingError, SQLAlchemyError):
+        # Table may not exist yet on new environments; return defaults instead of 500
+        return _defaults()
+
+    config = _config_response(cfg) if cfg else _defaults()
+    _local_config_cache[clinic_id] = config
+    await cache_manager.set(cache_key, config, TISS_CONFIG_CACHE_TTL)
+    return config
+
+
+def _config_response(cfg: TissConfig) -> Dict[str, Any]:
     return {
-        "prestador": {"cnpj": "", "nome": "", "codigo_prestador": "001"},
-        "operadora": {"cnpj": "", "nome": "Operadora Padrão", "registro_ans": "000000"},
-        "defaults": {"nome_plano": "Plano Padrão", "cbo_profissional": "2251", "hora_inicio": "08:00", "hora_fim": "09:00"},
-        "tiss": {"versao": "3.03.00", "enabled": True, "auto_generate": False},
+        "prestador": cfg.prestador or {},
+        "operadora": cfg.operadora or {},
+        "defaults": cfg.defaults or {},
+        "tiss": cfg.tiss or {},
     }
 
 
+async def _upsert_tiss_config(db: AsyncSession, clinic_id: int, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Create or update a clinic's TISS config in a single INSERT ... ON CONFLICT
+    ... RETURNING. New rows default missing sections to {}; existing rows only
+    replace the sections present in the payload.
+    Returns the saved config, or None when an existing row was left untouched.
+    """
+    values = {section: payload.get(section, {}) for section in TISS_CONFIG_SECTIONS}
+    stmt = pg_insert(TissConfig).values(clinic_id=clinic_id, **values)
+    updates = {section: stmt.excluded[section] for section in TISS_CONFIG_SECTIONS if section in payload}
+    if updates:
+        updates["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[TissConfig.clinic_id], set_=updates)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[TissConfig.clinic_id])
+    result = await db.execute(stmt.returning(TissConfig))
+    cfg = result.scalar_one_or_none()
+    return _config_response(cfg) if cfg else None
+
+
+async def _cache_saved_config(clinic_id: int, config: Optional[Dict[str, Any]]) -> None:
+    """Write the saved config through to the cache so the next read skips the database"""
+    if config is None:
+        _local_config_cache.pop(clinic_id, None)
+        await cache_manager.delete(_tiss_config_cache_key(clinic_id))
+    else:
+        _local_config_cache[clinic_id] = config
+        await cache_manager.set(_tiss_config_cache_key(clinic_id), config, TISS_CONFIG_CACHE_TTL)
+
+
 @router.get("")
 async def get_tiss_config(
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session),
 ):
-    try:
-        result = await db.execute(select(TissConfig).where(TissConfig.clinic_id == current_user.clinic_id))
-        cfg = result.scalar_one_or_none()
-        if not cfg:
-            return _defaults()
-        return {
-            "prestador": cfg.prestador or {},
-            "operadora": cfg.operadora or {},
-            "defaults": cfg.defaults or {},
-            "tiss": cfg.tiss or {},
-        }
-    except (ProgrammingError, SQLAlchemyError):
-        # Table may not exist yet on new environments; return defaults instead of 500
-        return _defaults()
+    return await load_tiss_config(current_user.clinic_id, db)
 
 
 @router.put("")
@@ -60,29 +137,9 @@ async def upsert_tiss_config(
                 detail="User is not associated with a clinic"
             )
         
-        result = await db.execute(select(TissConfig).where(TissConfig.clinic_id == current_user.clinic_id))
-        cfg = result.scalar_one_or_none()
-        if not cfg:
-            cfg = TissConfig(
-                clinic_id=current_user.clinic_id,
-                prestador=payload.get("prestador", {}),
-                operadora=payload.get("operadora", {}),
-                defaults=payload.get("defaults", {}),
-                tiss=payload.get("tiss", {}),
-            )
-            db.add(cfg)
-        else:
-            if "prestador" in payload:
-                cfg.prestador = payload.get("prestador", {})
-            if "operadora" in payload:
-                cfg.operadora = payload.get("operadora", {})
-            if "defaults" in payload:
-                cfg.defaults = payload.get("defaults", {})
-            if "tiss" in payload:
-                cfg.tiss = payload.get("tiss", {})
-
+        saved_config = await _upsert_tiss_config(db, current_user.clinic_id, payload)
         await db.commit()
-        await db.refresh(cfg)
+        await _cache_saved_config(current_user.clinic_id, saved_config)
         return {"message": "TISS config saved"}
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -97,8 +154,6 @@ async def upsert_tiss_config(
                 detail="TISS config storage not initialized. Run migrations: alembic upgrade head"
             )
         # For other database errors, return a generic message
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Database error saving TISS config: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
@@ -106,8 +161,6 @@ async def upsert_tiss_config(
         )
     except Exception as e:
         await db.rollback()
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Unexpected error saving TISS config: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
@@ -118,25 +171,13 @@ async def upsert_tiss_config(
 @router.get("/admin/{clinic_id}")
 async def get_tiss_config_for_clinic(
     clinic_id: int,
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(require_super_admin()),
-    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get TISS config for a specific clinic (SuperAdmin only)
     """
-    try:
-        result = await db.execute(select(TissConfig).where(TissConfig.clinic_id == clinic_id))
-        cfg = result.scalar_one_or_none()
-        if not cfg:
-            return _defaults()
-        return {
-            "prestador": cfg.prestador or {},
-            "operadora": cfg.operadora or {},
-            "defaults": cfg.defaults or {},
-            "tiss": cfg.tiss or {},
-        }
-    except (ProgrammingError, SQLAlchemyError):
-        return _defaults()
+    return await load_tiss_config(clinic_id, db)
 
 
 @router.put("/admin/{clinic_id}")
@@ -150,43 +191,26 @@ async def upsert_tiss_config_for_clinic(
     Update TISS config for a specific clinic (SuperAdmin only)
     """
     try:
-        # Validate clinic exists
-        from app.models import Clinic
-        clinic_result = await db.execute(select(Clinic).where(Clinic.id == clinic_id))
-        clinic = clinic_result.scalar_one_or_none()
-        if not clinic:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Clinic with id {clinic_id} not found"
-            )
-        
-        result = await db.execute(select(TissConfig).where(TissConfig.clinic_id == clinic_id))
-        cfg = result.scalar_one_or_none()
-        if not cfg:
-            cfg = TissConfig(
-                clinic_id=clinic_id,
-                prestador=payload.get("prestador", {}),
-                operadora=payload.get("operadora", {}),
-                defaults=payload.get("defaults", {}),
-                tiss=payload.get("tiss", {}),
-            )
-            db.add(cfg)
-        else:
-            if "prestador" in payload:
-                cfg.prestador = payload.get("prestador", {})
-            if "operadora" in payload:
-                cfg.operadora = payload.get("operadora", {})
-            if "defaults" in payload:
-                cfg.defaults = payload.get("defaults", {})
-            if "tiss" in payload:
-                cfg.tiss = payload.get("tiss", {})
-
+        # No clinic-exists lookup: the clinic_id FK rejects unknown clinics
+        saved_config = await _upsert_tiss_config(db, clinic_id, payload)
         await db.commit()
-        await db.refresh(cfg)
+        await _cache_saved_config(clinic_id, saved_config)
         return {"message": "TISS config saved"}
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
+    except IntegrityError as e:
+        await db.rollback()
+        error_msg = str(e.orig).lower()
+        if "foreign key" in error_msg and "clinic" in error_msg:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Clinic with id {clinic_id} not found"
+            )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error saving TISS config: {str(e)}"
+        )
     except (ProgrammingError, SQLAlchemyError) as e:
         await db.rollback()
         error_msg = str(e).lower()
@@ -197,8 +221,6 @@ async def upsert_tiss_config_for_clinic(
                 detail="TISS config storage not initialized. Run migrations: alembic upgrade head"
             )
         # For other database errors, return a generic message
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Database error saving TISS config: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
@@ -206,8 +228,6 @@ async def upsert_tiss_config_for_clinic(
         )
     except Exception as e:
         await db.rollback()
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Unexpected error saving TISS config: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
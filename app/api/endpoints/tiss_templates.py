@@ -5,10 +5,12 @@ Provides CRUD operations for TISS XML templates
 
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, update, or_
+from sqlalchemy.orm import load_only
+from sqlalchemy.exc import IntegrityError
 
 from app.core.auth import get_current_user
 from app.middleware.permissions import require_super_admin
@@ -16,34 +18,89 @@ from app.models import User, TissTemplate, TissTemplateCategory
 from app.schemas.tiss_template import (
     TissTemplateCreate,
     TissTemplateUpdate,
-    TissTemplateResponse
+    TissTemplateResponse,
+    TissTemplateListItem,
 )
-from database import get_async_session
+from database import get_async_session, get_read_session
+import logging
 import re
 
-router = APIRouter(tags=["TISS Templates"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["TISS Templates"], default_response_class=ORJSONResponse)
+
+_TEMPLATE_VARIABLE_RE = re.compile(r'\{\{(\w+)\}\}')
+
+# Listings never load the XML body
+_TEMPLATE_LIST_COLUMNS = load_only(
+    TissTemplate.id,
+    TissTemplate.name,
+    TissTemplate.description,
+    TissTemplate.category,
+    TissTemplate.variables,
+    TissTemplate.is_default,
+    TissTemplate.is_active,
+    TissTemplate.clinic_id,
+    TissTemplate.created_by_id,
+    TissTemplate.created_at,
+    TissTemplate.updated_at,
+)
 
 
 def extract_variables(xml_template: str) -> List[str]:
     """Extract variable names from XML template (e.g., {{VARIABLE_NAME}})"""
-    pattern = r'\{\{(\w+)\}\}'
-    variables = re.findall(pattern, xml_template)
-    return list(set(variables))  # Return unique variables
+    # Unique variables in order of first appearance
+    return list(dict.fromkeys(_TEMPLATE_VARIABLE_RE.findall(xml_template)))
+
+
+# Built once; validating through FastAPI's response_model would redo this per request
+_TEMPLATE_LIST_ADAPTER = TypeAdapter(List[TissTemplateListItem])
+
+
+def _template_list_response(templates) -> ORJSONResponse:
+    """Serialize template rows with the shared list adapter, bypassing response_model re-validation"""
+    items = _TEMPLATE_LIST_ADAPTER.validate_python(templates)
+    return ORJSONResponse(_TEMPLATE_LIST_ADAPTER.dump_python(items, mode="json"))
+
+
+# Enum values are the lowercased names, so one map covers "EXAM" and "exam"
+_CATEGORY_MAP = {c.value: c.value for c in TissTemplateCategory}
+
+
+def _resolve_category(category) -> str:
+    """Normalize a category (enum or string, any case) to its stored value, defaulting to custom"""
+    if isinstance(category, TissTemplateCategory):
+        return category.value
+    return _CATEGORY_MAP.get(str(category).lower(), TissTemplateCategory.CUSTOM.value)
+
+
+async def _get_clinic_template(db: AsyncSession, template_id: int, clinic_id: Optional[int]) -> TissTemplate:
+    """
+    Load a template by primary key (served from the identity map when already
+    loaded) and 404 unless it belongs to the given clinic
+    """
+    template = await db.get(TissTemplate, template_id)
+    if not template or template.clinic_id != clinic_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="TISS template not found"
+        )
+    return template
 
 
-@router.get("/templates", response_model=List[TissTemplateResponse])
+@router.get("/templates", response_model=List[TissTemplateListItem])
 async def get_tiss_templates(
     category: Optional[TissTemplateCategory] = Query(None, description="Filter by category"),
     is_default: Optional[bool] = Query(None, description="Filter by default status"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     search: Optional[str] = Query(None, description="Search in name and description"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get list of TISS templates
     """
-    query = select(TissTemplate).filter(
+    query = select(TissTemplate).options(_TEMPLATE_LIST_COLUMNS).filter(
         TissTemplate.clinic_id == current_user.clinic_id
     )
     
@@ -62,43 +119,19 @@ async def get_tiss_templates(
         query = query.filter(search_filter)
     
     result = await db.execute(query.order_by(TissTemplate.name))
-    templates = result.scalars().all()
-    
-    # Extract variables for each template
-    for template in templates:
-        if not template.variables:
-            template.variables = extract_variables(template.xml_template)
-    
-    return templates
+    return _template_list_response(result.scalars().all())
 
 
 @router.get("/templates/{template_id}", response_model=TissTemplateResponse)
 async def get_tiss_template(
     template_id: int,
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get a specific TISS template by ID
     """
-    query = select(TissTemplate).filter(
-        and_(
-            TissTemplate.id == template_id,
-            TissTemplate.clinic_id == current_user.clinic_id
-        )
-    )
-    result = await db.execute(query)
-    template = result.scalar_one_or_none()
-    
-    if not template:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="TISS template not found"
-        )
-    
-    # Extract variables if not already set
-    if not template.variables:
-        template.variables = extract_variables(template.xml_template)
+    template = await _get_clinic_template(db, template_id, current_user.clinic_id)
     
     return template
 
@@ -123,39 +156,27 @@ async def create_tiss_template(
         # Extract variables from template
         variables = extract_variables(template.xml_template)
         
-        # Get category and ensure it's the enum value (string), not the enum name
-        category = template.category
-        if isinstance(category, str):
-            # Normalize to lowercase and convert to enum
-            category_enum = TissTemplateCategory(category.lower())
-            category_value = category_enum.value  # Get the string value ("consultation", not "CONSULTATION")
-        elif isinstance(category, TissTemplateCategory):
-            # Already an enum, get its value
-            category_value = category.value
-        else:
-            # Default to custom
-            category_value = TissTemplateCategory.CUSTOM.value
+        # Store the enum value ("consultation"), not the enum name
+        category_value = _resolve_category(template.category)
         
         # Create template with category as string value (not enum object)
-        # SQLAlchemy with native_enum=False will store it as string
-        db_template = TissTemplate(
-            clinic_id=current_user.clinic_id,
-            created_by_id=current_user.id,
-            name=template.name,
-            description=template.description,
-            category=category_value,  # Use string value, not enum object
-            xml_template=template.xml_template,
-            variables=variables,
-            is_default=template.is_default,
-            is_active=template.is_active,
+        # SQLAlchemy with native_enum=False will store it as string.
+        # INSERT ... RETURNING fills id/created_at without a refresh round-trip
+        result = await db.execute(
+            insert(TissTemplate).values(
+                clinic_id=current_user.clinic_id,
+                created_by_id=current_user.id,
+                name=template.name,
+                description=template.description,
+                category=category_value,  # Use string value, not enum object
+                xml_template=template.xml_template,
+                variables=variables,
+                is_default=template.is_default,
+                is_active=template.is_active,
+            ).returning(TissTemplate)
         )
-        db.add(db_template)
+        db_template = result.scalar_one()
         await db.commit()
-        await db.refresh(db_template)
-        
-        # Extract variables for response
-        if not db_template.variables:
-            db_template.variables = extract_variables(db_template.xml_template)
         
         return db_template
     except HTTPException:
@@ -163,8 +184,6 @@ async def create_tiss_template(
         raise
     except Exception as e:
         await db.rollback()
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Error creating TISS template: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -183,32 +202,30 @@ async def update_tiss_template(
     Update a TISS template
     Only admins can update templates
     """
-    query = select(TissTemplate).filter(
-        and_(
-            TissTemplate.id == template_id,
-            TissTemplate.clinic_id == current_user.clinic_id
-        )
+    update_data = template_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return await _get_clinic_template(db, template_id, current_user.clinic_id)
+    
+    # If xml_template is updated, extract new variables
+    if 'xml_template' in update_data:
+        update_data['variables'] = extract_variables(update_data['xml_template'])
+    
+    # Single UPDATE ... RETURNING; the clinic filter keeps tenant isolation
+    result = await db.execute(
+        update(TissTemplate)
+        .where(TissTemplate.id == template_id, TissTemplate.clinic_id == current_user.clinic_id)
+        .values(**update_data)
+        .returning(TissTemplate)
+        .execution_options(synchronize_session=False)
     )
-    result = await db.execute(query)
     db_template = result.scalar_one_or_none()
-    
     if not db_template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="TISS template not found"
         )
     
-    update_data = template_update.model_dump(exclude_unset=True)
-    
-    # If xml_template is updated, extract new variables
-    if 'xml_template' in update_data:
-        update_data['variables'] = extract_variables(update_data['xml_template'])
-    
-    for field, value in update_data.items():
-        setattr(db_template, field, value)
-    
     await db.commit()
-    await db.refresh(db_template)
     return db_template
 
 
@@ -222,20 +239,7 @@ async def delete_tiss_template(
     Delete a TISS template
     Only admins can delete templates. Default templates cannot be deleted.
     """
-    query = select(TissTemplate).filter(
-        and_(
-            TissTemplate.id == template_id,
-            TissTemplate.clinic_id == current_user.clinic_id
-        )
-    )
-    result = await db.execute(query)
-    db_template = result.scalar_one_or_none()
-    
-    if not db_template:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="TISS template not found"
-        )
+    db_template = await _get_clinic_template(db, template_id, current_user.clinic_id)
     
     if db_template.is_default:
         raise HTTPException(
@@ -260,61 +264,50 @@ async def create_tiss_template_for_clinic(
     Create a new TISS template for a specific clinic (SuperAdmin only)
     """
     try:
-        # Validate clinic exists
-        from app.models import Clinic
-        clinic_result = await db.execute(select(Clinic).where(Clinic.id == clinic_id))
-        clinic = clinic_result.scalar_one_or_none()
-        if not clinic:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Clinic with id {clinic_id} not found"
-            )
-        
+        # No clinic-exists lookup: the clinic_id FK rejects unknown clinics on insert
         # Extract variables from template
         variables = extract_variables(template.xml_template)
         
-        # Get category and ensure it's the enum value (string), not the enum name
-        category = template.category
-        if isinstance(category, str):
-            # Normalize to lowercase and convert to enum
-            category_enum = TissTemplateCategory(category.lower())
-            category_value = category_enum.value  # Get the string value ("consultation", not "CONSULTATION")
-        elif isinstance(category, TissTemplateCategory):
-            # Already an enum, get its value
-            category_value = category.value
-        else:
-            # Default to custom
-            category_value = TissTemplateCategory.CUSTOM.value
+        # Store the enum value ("consultation"), not the enum name
+        category_value = _resolve_category(template.category)
         
         # Create template with category as string value (not enum object)
-        # SQLAlchemy with native_enum=False will store it as string
-        db_template = TissTemplate(
-            clinic_id=clinic_id,
-            created_by_id=current_user.id,
-            name=template.name,
-            description=template.description,
-            category=category_value,  # Use string value, not enum object
-            xml_template=template.xml_template,
-            variables=variables,
-            is_default=template.is_default,
-            is_active=template.is_active,
+        # SQLAlchemy with native_enum=False will store it as string.
+        # INSERT ... RETURNING fills id/created_at without a refresh round-trip
+        result = await db.execute(
+            insert(TissTemplate).values(
+                clinic_id=clinic_id,
+                created_by_id=current_user.id,
+                name=template.name,
+                description=template.description,
+                category=category_value,  # Use string value, not enum object
+                xml_template=template.xml_template,
+                variables=variables,
+                is_default=template.is_default,
+                is_active=template.is_active,
+            ).returning(TissTemplate)
         )
-        db.add(db_template)
+        db_template = result.scalar_one()
         await db.commit()
-        await db.refresh(db_template)
-        
-        # Extract variables for response
-        if not db_template.variables:
-            db_template.variables = extract_variables(db_template.xml_template)
         
         return db_template
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
+    except IntegrityError as e:
+        await db.rollback()
+        error_msg = str(e.orig).lower()
+        if "foreign key" in error_msg and "clinic" in error_msg:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Clinic with id {clinic_id} not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating TISS template: {str(e)}"
+        )
     except Exception as e:
         await db.rollback()
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Error creating TISS template for clinic {clinic_id}: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -322,20 +315,20 @@ async def create_tiss_template_for_clinic(
         )
 
 
-@router.get("/admin/{clinic_id}/templates", response_model=List[TissTemplateResponse])
+@router.get("/admin/{clinic_id}/templates", response_model=List[TissTemplateListItem])
 async def get_tiss_templates_for_clinic(
     clinic_id: int,
     category: Optional[TissTemplateCategory] = Query(None, description="Filter by category"),
     is_default: Optional[bool] = Query(None, description="Filter by default status"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     search: Optional[str] = Query(None, description="Search in name and description"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(require_super_admin()),
-    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get list of TISS templates for a specific clinic (SuperAdmin only)
     """
-    query = select(TissTemplate).filter(
+    query = select(TissTemplate).options(_TEMPLATE_LIST_COLUMNS).filter(
         TissTemplate.clinic_id == clinic_id
     )
     
@@ -354,12 +347,5 @@ async def get_tiss_templates_for_clinic(
         query = query.filter(search_filter)
     
     result = await db.execute(query.order_by(TissTemplate.name))
-    templates = result.scalars().all()
-    
-    # Extract variables for each template
-    for template in templates:
-        if not template.variables:
-            template.variables = extract_variables(template.xml_template)
-    
-    return templates
+    return _template_list_response(result.scalars().all())
 
@@ -2,18 +2,25 @@
 User Settings API endpoints
 Handles user preferences and settings management
 """
-from typing import Optional
+from typing import Any, BinaryIO, Dict, Optional, Set
+import asyncio
+import hashlib
+import json
 import os
+import re
 import uuid
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from PIL import Image
-import io
 
 from app.core.auth import get_current_user
+from app.core.http_cache import not_modified
 from app.models import User, UserSettings
 from app.schemas.user_settings import (
     UserSettingsUpdate,
@@ -22,83 +29,152 @@ from app.schemas.user_settings import (
     NotificationSettings,
     PrivacySettings,
     AppearanceSettings,
-    SecuritySettings
+    SecuritySettings,
+    ProfileUpdate,
+    PasswordChange,
+    PushSubscriptionCreate,
+    PushSubscriptionRemove,
 )
 from app.services.email_service import email_service, check_email_notifications_enabled, send_notification_email_if_enabled
 from app.services.push_service import push_service, check_push_notifications_enabled
 from app.services.sms_service import sms_service, check_sms_notifications_enabled
+from app.services.user_settings_cache import forget_user_settings, invalidate_notification_settings
+from app.services.two_factor_service import invalidate_2fa_status
 from app.models.push_subscription import PushSubscription
-from database import get_async_session
+from database import get_async_session, get_read_session
 
-router = APIRouter(prefix="/settings", tags=["User Settings"])
+router = APIRouter(prefix="/settings", tags=["User Settings"], default_response_class=ORJSONResponse)
 
 # Avatar storage configuration
 AVATAR_DIR = os.getenv("AVATAR_STORAGE_DIR", os.path.join("storage", "avatars"))
 AVATAR_MAX_SIZE = 5 * 1024 * 1024  # 5MB
+AVATAR_MAX_DIMENSION = 512  # Avatars are downscaled to fit 512x512
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+_ALLOWED_IMAGE_TYPE_SET = frozenset(ALLOWED_IMAGE_TYPES)
+_ALLOWED_IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp"})
+
+# Authenticator codes are exactly six ASCII digits
+_TOTP_CODE_RE = re.compile(r"[0-9]{6}")
 
 # Ensure avatar directory exists
 os.makedirs(AVATAR_DIR, exist_ok=True)
 
 
+# Built once; every section is a flat dict, so a per-section dict() is a full copy
+_DEFAULT_SETTINGS = {
+    "notifications": NotificationSettings().model_dump(),
+    "privacy": PrivacySettings().model_dump(),
+    "appearance": AppearanceSettings().model_dump(),
+    "security": SecuritySettings().model_dump(),
+}
+
+
 def get_default_settings():
     """Get default settings structure"""
-    return {
-        "notifications": NotificationSettings().model_dump(),
-        "privacy": PrivacySettings().model_dump(),
-        "appearance": AppearanceSettings().model_dump(),
-        "security": SecuritySettings().model_dump(),
-    }
+    return {section: dict(values) for section, values in _DEFAULT_SETTINGS.items()}
+
+
+# Validated once; users without a settings row get a model_copy with their profile
+_DEFAULT_RESPONSE = UserSettingsFullResponse(profile={}, **_DEFAULT_SETTINGS)
+
+# Part of the settings ETag, so a deploy that changes the defaults invalidates it
+_DEFAULTS_VERSION = hashlib.md5(
+    json.dumps(_DEFAULT_SETTINGS, sort_keys=True).encode()
+).hexdigest()[:8]
+
+
+def _settings_etag(user: User, user_settings) -> str:
+    """
+    Weak ETag for GET /me, built from what the response depends on: the user's
+    row (profile fields), their settings row and the default sections
+    """
+    user_version = (user.updated_at or user.created_at).timestamp()
+    settings_version = (
+        (user_settings.updated_at or user_settings.created_at).timestamp()
+        if user_settings else 0
+    )
+    return f'W/"{user.id}-{user_version:.6f}-{settings_version:.6f}-{_DEFAULTS_VERSION}"'
+
+
+def _user_settings_upsert(user_id: int, changes: Dict[str, Any]):
+    """
+    Build an INSERT ... ON CONFLICT (user_id) DO UPDATE for a user's settings.
+    New rows fill sections missing from ``changes`` with the defaults; existing
+    rows only replace the fields present in ``changes``.
+    """
+    # Values are only bound as parameters, so the shared defaults need no copy
+    stmt = pg_insert(UserSettings).values(user_id=user_id, **{**_DEFAULT_SETTINGS, **changes})
+    updates = {field: stmt.excluded[field] for field in changes}
+    # Column onupdate hooks don't fire for ON CONFLICT, so bump updated_at here.
+    # With nothing to change, assigning updated_at to itself still returns the row
+    updates["updated_at"] = func.now() if changes else UserSettings.updated_at
+    return stmt.on_conflict_do_update(index_elements=[UserSettings.user_id], set_=updates)
+
+
+async def _upsert_user_settings(db: AsyncSession, user_id: int, changes: Dict[str, Any]) -> UserSettings:
+    """Create or update a user's settings in one round-trip and return the saved row"""
+    forget_user_settings(user_id, db)
+    result = await db.execute(
+        _user_settings_upsert(user_id, changes).returning(UserSettings),
+        execution_options={"populate_existing": True},
+    )
+    return result.scalar_one()
 
 
 @router.get("/me", response_model=UserSettingsFullResponse)
 async def get_user_settings(
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get current user's settings
     Returns settings with profile information
+    Supports If-None-Match revalidation against the returned ETag
     """
-    # Get or create user settings
+    # Only the response columns, as a plain row (no ORM instance to build)
     result = await db.execute(
-        select(UserSettings).where(UserSettings.user_id == current_user.id)
-    )
-    user_settings = result.scalar_one_or_none()
-    
-    # If no settings exist, return defaults
-    if not user_settings:
-        defaults = get_default_settings()
-        return UserSettingsFullResponse(
-            profile={
-                "firstName": current_user.first_name or "",
-                "lastName": current_user.last_name or "",
-                "email": current_user.email,
-                "phone": "",
-                "avatar": None,
-            },
-            notifications=defaults["notifications"],
-            privacy=defaults["privacy"],
-            appearance=defaults["appearance"],
-            security=defaults["security"],
-        )
-    
-    # Return settings with profile info
-    # Use get() to handle None values, but preserve empty dicts
-    defaults = get_default_settings()
-    return UserSettingsFullResponse(
-        profile={
-            "firstName": current_user.first_name or "",
-            "lastName": current_user.last_name or "",
-            "email": current_user.email,
-            "phone": user_settings.phone or "",
-            "avatar": user_settings.avatar_url or None,
-        },
-        notifications=user_settings.notifications if user_settings.notifications is not None else defaults["notifications"],
-        privacy=user_settings.privacy if user_settings.privacy is not None else defaults["privacy"],
-        appearance=user_settings.appearance if user_settings.appearance is not None else defaults["appearance"],
-        security=user_settings.security if user_settings.security is not None else defaults["security"],
+        select(
+            UserSettings.phone,
+            UserSettings.avatar_url,
+            UserSettings.notifications,
+            UserSettings.privacy,
+            UserSettings.appearance,
+            UserSettings.security,
+            UserSettings.created_at,
+            UserSettings.updated_at,
+        ).where(UserSettings.user_id == current_user.id)
     )
+    user_settings = result.one_or_none()
+    
+    etag = _settings_etag(current_user, user_settings)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    profile = {
+        "firstName": current_user.first_name or "",
+        "lastName": current_user.last_name or "",
+        "email": current_user.email,
+        "phone": (user_settings.phone if user_settings else None) or "",
+        "avatar": (user_settings.avatar_url if user_settings else None) or None,
+    }
+    if user_settings is None:
+        # model_copy skips validation; the shared sections are only read here
+        response = _DEFAULT_RESPONSE.model_copy(update={"profile": profile})
+    else:
+        # Missing section -> defaults (the response model copies them)
+        sections = {
+            section: (
+                getattr(user_settings, section)
+                if getattr(user_settings, section) is not None
+                else default
+            )
+            for section, default in _DEFAULT_SETTINGS.items()
+        }
+        response = UserSettingsFullResponse(profile=profile, **sections)
+    # Already validated; skip response_model re-validation
+    return ORJSONResponse(response.model_dump(mode="json"), headers=headers)
 
 
 @router.put("/me", response_model=UserSettingsResponse)
@@ -111,59 +187,15 @@ async def update_user_settings(
     Update current user's settings
     Creates settings if they don't exist
     """
-    # Get or create user settings
-    result = await db.execute(
-        select(UserSettings).where(UserSettings.user_id == current_user.id)
-    )
-    user_settings = result.scalar_one_or_none()
-    
-    if not user_settings:
-        # Create new settings - use provided values or defaults
-        defaults = get_default_settings()
-        user_settings = UserSettings(
-            user_id=current_user.id,
-            phone=settings_update.phone if settings_update.phone is not None else None,
-            notifications=settings_update.notifications if settings_update.notifications is not None else defaults["notifications"],
-            privacy=settings_update.privacy if settings_update.privacy is not None else defaults["privacy"],
-            appearance=settings_update.appearance if settings_update.appearance is not None else defaults["appearance"],
-            security=settings_update.security if settings_update.security is not None else defaults["security"],
-        )
-        db.add(user_settings)
-    else:
-        # Update existing settings - frontend sends complete objects, so replace directly
-        if settings_update.phone is not None:
-            user_settings.phone = settings_update.phone
-        if settings_update.notifications is not None:
-            # Replace with the new notifications dict
-            user_settings.notifications = settings_update.notifications
-        if settings_update.privacy is not None:
-            # Replace with the new privacy dict
-            user_settings.privacy = settings_update.privacy
-        if settings_update.appearance is not None:
-            # Replace with the new appearance dict
-            user_settings.appearance = settings_update.appearance
-        if settings_update.security is not None:
-            # Replace with the new security dict
-            user_settings.security = settings_update.security
-    
+    # Frontend sends complete objects, so provided sections replace the stored ones
+    changes = {field: value for field, value in settings_update if value is not None}
     try:
-        # Ensure all JSON fields are properly set (not None)
-        if user_settings.notifications is None:
-            user_settings.notifications = get_default_settings()["notifications"]
-        if user_settings.privacy is None:
-            user_settings.privacy = get_default_settings()["privacy"]
-        if user_settings.appearance is None:
-            user_settings.appearance = get_default_settings()["appearance"]
-        if user_settings.security is None:
-            user_settings.security = get_default_settings()["security"]
-        
+        user_settings = await _upsert_user_settings(db, current_user.id, changes)
         await db.commit()
-        await db.refresh(user_settings)
-        
-        # Verify the data was saved
-        if user_settings.notifications is None or user_settings.privacy is None:
-            raise ValueError("Settings were not properly saved to database")
-        
+        if "notifications" in changes or "phone" in changes:
+            await invalidate_notification_settings(current_user.id, db)
+        if "security" in changes:
+            invalidate_2fa_status(current_user.id)
         return UserSettingsResponse.model_validate(user_settings)
     except Exception as e:
         await db.rollback()
@@ -175,7 +207,7 @@ async def update_user_settings(
 
 @router.post("/me/profile")
 async def update_user_profile(
-    profile_data: dict,
+    profile_data: ProfileUpdate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
@@ -183,50 +215,36 @@ async def update_user_profile(
     Update user profile information (first_name, last_name, email)
     Also updates settings phone if provided
     """
-    # Update user model fields
-    if "firstName" in profile_data:
-        current_user.first_name = profile_data["firstName"]
-    if "lastName" in profile_data:
-        current_user.last_name = profile_data["lastName"]
-    if "email" in profile_data:
-        # Check if email is already taken by another user
-        result = await db.execute(
-            select(User).where(
-                User.email == profile_data["email"],
-                User.id != current_user.id
-            )
-        )
-        if result.scalar_one_or_none():
+    # Update user model fields (only the keys the client sent)
+    sent = profile_data.model_fields_set
+    if "firstName" in sent:
+        current_user.first_name = profile_data.firstName
+    if "lastName" in sent:
+        current_user.last_name = profile_data.lastName
+    if "email" in sent:
+        # Uniqueness is enforced by the unique index on users.email
+        current_user.email = profile_data.email
+    
+    try:
+        # Update or create settings for phone
+        if "phone" in sent:
+            await _upsert_user_settings(db, current_user.id, {"phone": profile_data.phone})
+        await db.commit()
+        if "phone" in sent:
+            await invalidate_notification_settings(current_user.id, db)
+        return {"message": "Profile updated successfully"}
+    except IntegrityError as e:
+        await db.rollback()
+        # Only the unique index counts as a duplicate (not e.g. a NOT NULL violation)
+        if "ix_users_email" in str(e.orig):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already in use"
             )
-        current_user.email = profile_data["email"]
-    
-    # Update or create settings for phone
-    if "phone" in profile_data:
-        result = await db.execute(
-            select(UserSettings).where(UserSettings.user_id == current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update profile: {str(e)}"
         )
-        user_settings = result.scalar_one_or_none()
-        
-        if not user_settings:
-            defaults = get_default_settings()
-            user_settings = UserSettings(
-                user_id=current_user.id,
-                phone=profile_data["phone"],
-                notifications=defaults["notifications"],
-                privacy=defaults["privacy"],
-                appearance=defaults["appearance"],
-                security=defaults["security"],
-            )
-            db.add(user_settings)
-        else:
-            user_settings.phone = profile_data["phone"]
-    
-    try:
-        await db.commit()
-        return {"message": "Profile updated successfully"}
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -235,6 +253,78 @@ async def update_user_profile(
         )
 
 
+def _sniff_image_type(content: bytes) -> Optional[str]:
+    """Return the MIME type matching the file's magic bytes, or None if it isn't a supported image"""
+    if content[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if content[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if content[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _upload_size(file: BinaryIO) -> int:
+    """Size of a spooled upload, found by seeking to its end (the position is reset)"""
+    size = file.seek(0, os.SEEK_END)
+    file.seek(0)
+    return size
+
+
+def _save_avatar_image(source: BinaryIO, file_path: str) -> None:
+    """Decode an uploaded image, flatten it to RGB, cap it at AVATAR_MAX_DIMENSION and save it as JPEG"""
+    # PIL reads from the spooled upload directly, pulling only the bytes it decodes
+    image = Image.open(source)
+    # Palette images only resize with NEAREST, so expand them first; without a
+    # transparent index there is nothing to flatten, so go straight to RGB
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    
+    # Resize before flattening so the RGB conversion works on at most 512x512
+    # pixels; for JPEG input thumbnail() also lets libjpeg decode at a reduced scale
+    if image.width > AVATAR_MAX_DIMENSION or image.height > AVATAR_MAX_DIMENSION:
+        image.thumbnail((AVATAR_MAX_DIMENSION, AVATAR_MAX_DIMENSION), Image.Resampling.LANCZOS)
+    
+    # Convert to RGB if necessary (for PNG with transparency)
+    if image.mode in ('RGBA', 'LA'):
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.getchannel('A') if image.mode == 'RGBA' else None)
+        image = rgb_image
+    
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # Write beside the target and rename into place, so a crash mid-write
+    # never leaves a truncated avatar at the published path
+    tmp_path = file_path + ".tmp"
+    try:
+        image.save(tmp_path, 'JPEG', quality=85, optimize=True)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        _remove_avatar_file(tmp_path)
+        raise
+
+
+# The event loop only keeps weak references to tasks; hold fire-and-forget
+# tasks here until they finish so they can't be garbage-collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _run_in_background(coro) -> None:
+    """Schedule a coroutine without awaiting it, keeping it alive until done"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _remove_avatar_file(file_path: str) -> None:
+    """Delete an avatar file, ignoring files that are already gone or cannot be removed"""
+    try:
+        os.unlink(file_path)
+    except OSError:
+        pass
+
+
 @router.post("/me/avatar")
 async def upload_avatar(
     avatar: UploadFile = File(...),
@@ -252,64 +342,40 @@ async def upload_avatar(
             detail="No file provided"
         )
     
-    # Validate file type by content-type or extension
-    filename_lower = avatar.filename.lower()
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    has_valid_extension = any(filename_lower.endswith(ext) for ext in valid_extensions)
-    
-    if avatar.content_type and avatar.content_type not in ALLOWED_IMAGE_TYPES:
-        if not has_valid_extension:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_IMAGE_TYPES)}"
-            )
-    elif not avatar.content_type and not has_valid_extension:
+    # Check the size of the spooled upload without reading it into memory
+    # (the spool may be on disk, so the seek runs in a thread)
+    size = await asyncio.to_thread(_upload_size, avatar.file)
+    if size > AVATAR_MAX_SIZE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Please upload an image file (JPG, PNG, GIF, or WebP)"
+            detail=f"File too large. Maximum size is {AVATAR_MAX_SIZE / (1024 * 1024)}MB"
         )
     
-    # Read file content
-    content = await avatar.read()
-    
-    # Validate file size
-    if len(content) > AVATAR_MAX_SIZE:
+    # Validate file type from the file's own signature; the client-supplied
+    # Content-Type and extension are not trusted
+    header = await avatar.read(12)
+    await avatar.seek(0)
+    if _sniff_image_type(header) not in _ALLOWED_IMAGE_TYPE_SET:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large. Maximum size is {AVATAR_MAX_SIZE / (1024 * 1024)}MB"
+            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_IMAGE_TYPES)}"
         )
     
     # Validate and process image
     try:
-        image = Image.open(io.BytesIO(content))
-        # Convert to RGB if necessary (for PNG with transparency)
-        if image.mode in ('RGBA', 'LA', 'P'):
-            rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = rgb_image
-        
-        # Resize image if too large (max 512x512)
-        max_size = 512
-        if image.width > max_size or image.height > max_size:
-            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-        
         # Generate unique filename
         file_ext = Path(avatar.filename or 'avatar.jpg').suffix or '.jpg'
-        if file_ext not in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+        if file_ext not in _ALLOWED_IMAGE_EXTENSIONS:
             file_ext = '.jpg'
         
         filename = f"{current_user.id}_{uuid.uuid4().hex[:8]}{file_ext}"
         
-        # Create user-specific directory
+        # User-specific directory
         user_dir = os.path.join(AVATAR_DIR, str(current_user.clinic_id))
-        os.makedirs(user_dir, exist_ok=True)
-        
         file_path = os.path.join(user_dir, filename)
         
-        # Save image
-        image.save(file_path, 'JPEG', quality=85, optimize=True)
+        # Decoding, resizing and JPEG encoding are CPU-bound; keep them off the event loop
+        await asyncio.to_thread(_save_avatar_image, avatar.file, file_path)
         
         # Generate URL path (relative to storage)
         avatar_url = f"/storage/avatars/{current_user.clinic_id}/{filename}"
@@ -320,38 +386,26 @@ async def upload_avatar(
             detail=f"Invalid image file: {str(e)}"
         )
     
-    # Get or create user settings
-    result = await db.execute(
-        select(UserSettings).where(UserSettings.user_id == current_user.id)
-    )
-    user_settings = result.scalar_one_or_none()
-    
-    if not user_settings:
-        defaults = get_default_settings()
-        user_settings = UserSettings(
-            user_id=current_user.id,
-            avatar_url=avatar_url,
-            notifications=defaults["notifications"],
-            privacy=defaults["privacy"],
-            appearance=defaults["appearance"],
-            security=defaults["security"],
-        )
-        db.add(user_settings)
-    else:
-        # Delete old avatar if exists
-        if user_settings.avatar_url:
-            old_path = user_settings.avatar_url.replace("/storage/avatars/", AVATAR_DIR + "/")
-            if os.path.exists(old_path):
-                try:
-                    os.remove(old_path)
-                except:
-                    pass  # Ignore errors when deleting old file
-        
-        user_settings.avatar_url = avatar_url
-    
     try:
+        # Upsert the new URL; RETURNING subqueries see the pre-statement
+        # snapshot, so this also yields the avatar being replaced (NULL on insert)
+        previous_avatar = (
+            select(UserSettings.avatar_url)
+            .where(UserSettings.user_id == current_user.id)
+            .scalar_subquery()
+        )
+        forget_user_settings(current_user.id, db)
+        result = await db.execute(
+            _user_settings_upsert(current_user.id, {"avatar_url": avatar_url}).returning(previous_avatar)
+        )
+        old_avatar_url = result.scalar_one()
         await db.commit()
-        await db.refresh(user_settings)
+        
+        # Delete old avatar if exists
+        if old_avatar_url and old_avatar_url != avatar_url:
+            old_path = old_avatar_url.replace("/storage/avatars/", AVATAR_DIR + "/")
+            # The response doesn't depend on the delete, so don't wait for it
+            _run_in_background(asyncio.to_thread(_remove_avatar_file, old_path))
         
         # Return full URL (use relative path, frontend will handle base URL)
         # In production, you might want to use a CDN or storage service URL
@@ -370,11 +424,7 @@ async def upload_avatar(
     except Exception as e:
         await db.rollback()
         # Clean up uploaded file
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
+        await asyncio.to_thread(_remove_avatar_file, file_path)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save avatar: {str(e)}"
@@ -383,7 +433,7 @@ async def upload_avatar(
 
 @router.post("/me/change-password")
 async def change_password(
-    password_data: dict,
+    password_data: PasswordChange,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
@@ -393,9 +443,9 @@ async def change_password(
     """
     from app.core.auth import verify_password, hash_password
     
-    current_password = password_data.get("currentPassword")
-    new_password = password_data.get("newPassword")
-    confirm_password = password_data.get("confirmPassword")
+    current_password = password_data.currentPassword
+    new_password = password_data.newPassword
+    confirm_password = password_data.confirmPassword
     
     # Check if user is trying to change password (at least one field is provided)
     is_changing_password = bool(current_password or new_password or confirm_password)
@@ -423,19 +473,18 @@ async def change_password(
             detail="New password must be at least 8 characters long"
         )
     
-    # Verify current password
-    if not verify_password(current_password, current_user.hashed_password):
+    # Verify current password (bcrypt is CPU-bound, so run it in a thread)
+    if not await asyncio.to_thread(verify_password, current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Current password is incorrect"
         )
     
     # Update password
-    current_user.hashed_password = hash_password(new_password)
+    current_user.hashed_password = await asyncio.to_thread(hash_password, new_password)
     
     try:
         await db.commit()
-        await db.refresh(current_user)
         return {"message": "Password changed successfully"}
     except Exception as e:
         await db.rollback()
@@ -467,11 +516,7 @@ async def delete_avatar(
     
     # Delete file
     file_path = user_settings.avatar_url.replace("/storage/avatars/", AVATAR_DIR + "/")
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            pass  # Continue even if file deletion fails
+    await asyncio.to_thread(_remove_avatar_file, file_path)
     
     # Remove avatar URL from settings
     user_settings.avatar_url = None
@@ -539,7 +584,7 @@ async def test_email_notification(
 
 @router.post("/me/push-subscription")
 async def subscribe_push_notification(
-    subscription_data: dict,
+    subscription_data: PushSubscriptionCreate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
@@ -547,53 +592,32 @@ async def subscribe_push_notification(
     Subscribe to push notifications
     """
     try:
-        endpoint = subscription_data.get("endpoint")
-        keys = subscription_data.get("keys", {})
-        p256dh = keys.get("p256dh")
-        auth = keys.get("auth")
-        user_agent = subscription_data.get("userAgent")
-        device_info = subscription_data.get("deviceInfo")
-        
-        if not endpoint or not p256dh or not auth:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid subscription data. Missing endpoint, p256dh, or auth."
-            )
-        
-        # Check if subscription already exists
-        result = await db.execute(
-            select(PushSubscription).where(
-                PushSubscription.user_id == current_user.id,
-                PushSubscription.endpoint == endpoint
-            )
+        # Create the subscription, or refresh keys and reactivate it if this
+        # user already registered the endpoint
+        stmt = pg_insert(PushSubscription).values(
+            user_id=current_user.id,
+            endpoint=subscription_data.endpoint,
+            p256dh=subscription_data.keys.p256dh,
+            auth=subscription_data.keys.auth,
+            user_agent=subscription_data.userAgent,
+            device_info=subscription_data.deviceInfo,
+            is_active=True,
         )
-        existing = result.scalar_one_or_none()
-        
-        if existing:
-            # Update existing subscription
-            existing.p256dh = p256dh
-            existing.auth = auth
-            existing.user_agent = user_agent
-            existing.device_info = device_info
-            existing.is_active = True
-        else:
-            # Create new subscription
-            subscription = PushSubscription(
-                user_id=current_user.id,
-                endpoint=endpoint,
-                p256dh=p256dh,
-                auth=auth,
-                user_agent=user_agent,
-                device_info=device_info,
-                is_active=True,
-            )
-            db.add(subscription)
-        
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PushSubscription.user_id, PushSubscription.endpoint],
+            set_={
+                "p256dh": stmt.excluded.p256dh,
+                "auth": stmt.excluded.auth,
+                "user_agent": stmt.excluded.user_agent,
+                "device_info": stmt.excluded.device_info,
+                "is_active": True,
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
         await db.commit()
         return {"message": "Push subscription saved successfully"}
         
-    except HTTPException:
-        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -604,7 +628,7 @@ async def subscribe_push_notification(
 
 @router.post("/me/push-subscription/unsubscribe")
 async def unsubscribe_push_notification(
-    subscription_data: dict,
+    subscription_data: PushSubscriptionRemove,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
@@ -612,41 +636,25 @@ async def unsubscribe_push_notification(
     Unsubscribe from push notifications
     """
     try:
-        endpoint = subscription_data.get("endpoint")
-        
-        if not endpoint:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Endpoint is required"
-            )
-        
-        # Find and deactivate all subscriptions for user (or specific endpoint)
-        if endpoint:
-            result = await db.execute(
-                select(PushSubscription).where(
-                    PushSubscription.user_id == current_user.id,
-                    PushSubscription.endpoint == endpoint
-                )
-            )
-        else:
-            result = await db.execute(
-                select(PushSubscription).where(
-                    PushSubscription.user_id == current_user.id
-                )
+        # Deactivate the user's subscription(s) for this endpoint in one UPDATE
+        result = await db.execute(
+            update(PushSubscription)
+            .where(
+                PushSubscription.user_id == current_user.id,
+                PushSubscription.endpoint == subscription_data.endpoint
             )
+            .values(is_active=False)
+            .returning(PushSubscription.id)
+            .execution_options(synchronize_session=False)
+        )
+        deactivated = len(result.scalars().all())
         
-        subscriptions = result.scalars().all()
-        
-        if subscriptions:
-            for subscription in subscriptions:
-                subscription.is_active = False
+        if deactivated:
             await db.commit()
-            return {"message": f"Push subscription(s) removed successfully ({len(subscriptions)} subscription(s))"}
+            return {"message": f"Push subscription(s) removed successfully ({deactivated} subscription(s))"}
         else:
             return {"message": "No active subscriptions found"}
         
-    except HTTPException:
-        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -1043,7 +1051,8 @@ async def verify_2fa(
     from app.services.two_factor_service import two_factor_service
     
     code = request_data.get("code", "")
-    if not code or len(code) != 6:
+    # Reject malformed codes before the settings lookup and TOTP check
+    if not isinstance(code, str) or not _TOTP_CODE_RE.fullmatch(code):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid code. Please enter a 6-digit code."
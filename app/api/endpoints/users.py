@@ -1,10 +1,13 @@
 """
 User management API endpoints
 """
+import asyncio
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, or_, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
 from app.core.auth import get_current_user, RoleChecker
@@ -57,6 +60,27 @@ class UserListResponse(BaseModel):
         from_attributes = True
 
 
+def _user_list_columns():
+    """
+    UserListResponse fields as a projection, so list endpoints return rows
+    instead of ORM objects that each need a validate/dump pass
+    """
+    from app.models import Clinic
+    return (
+        User.id,
+        User.username,
+        User.email,
+        func.coalesce(User.first_name, "").label("first_name"),
+        func.coalesce(User.last_name, "").label("last_name"),
+        User.role,
+        User.clinic_id,
+        Clinic.name.label("clinic_name"),
+        User.is_active,
+        User.is_verified,
+        User.consultation_room,
+    )
+
+
 @router.get("/doctors", response_model=List[UserListResponse])
 async def get_doctors(
     current_user: User = Depends(get_current_user),
@@ -68,22 +92,15 @@ async def get_doctors(
     Must be defined before the generic "" route to ensure correct matching
     """
     from app.models import Clinic
-    query = select(User, Clinic.name).join(Clinic, User.clinic_id == Clinic.id).filter(
+    query = select(*_user_list_columns()).join(Clinic, User.clinic_id == Clinic.id).filter(
         User.clinic_id == current_user.clinic_id,
         User.role == UserRole.DOCTOR,
         User.is_active == True
     ).order_by(User.first_name, User.last_name)
     
     result = await db.execute(query)
-    doctors_data = result.all()
-    
-    doctors_list = []
-    for doctor, clinic_name in doctors_data:
-        doctor_dict = UserListResponse.model_validate(doctor).model_dump()
-        doctor_dict["clinic_name"] = clinic_name
-        doctors_list.append(doctor_dict)
-    
-    return doctors_list
+    # Rows already have the response shape; skip per-row model validation
+    return ORJSONResponse([dict(row) for row in result.mappings()])
 
 
 @router.get("", response_model=List[UserListResponse])
@@ -105,12 +122,12 @@ async def list_users(
     
     # Build query - SuperAdmin can see all users, others only their clinic
     if is_super:
-        query = select(User, Clinic.name).join(Clinic, User.clinic_id == Clinic.id)
+        query = select(*_user_list_columns()).join(Clinic, User.clinic_id == Clinic.id)
         # SuperAdmin can filter by clinic_id if provided
         if clinic_id:
             query = query.filter(User.clinic_id == clinic_id)
     else:
-        query = select(User, Clinic.name).join(Clinic, User.clinic_id == Clinic.id).filter(
+        query = select(*_user_list_columns()).join(Clinic, User.clinic_id == Clinic.id).filter(
             User.clinic_id == current_user.clinic_id
         )
     
@@ -124,16 +141,8 @@ async def list_users(
     query = query.order_by(User.first_name, User.last_name)
     
     result = await db.execute(query)
-    users_data = result.all()
-    
-    users_list = []
-    for user, clinic_name in users_data:
-        user_dict = UserListResponse.model_validate(user).model_dump()
-        user_dict["clinic_name"] = clinic_name
-        user_dict["clinic_id"] = user.clinic_id
-        users_list.append(user_dict)
-    
-    return users_list
+    # Rows already have the response shape; skip per-row model validation
+    return ORJSONResponse([dict(row) for row in result.mappings()])
 
 
 class UserCreateRequest(BaseModel):
@@ -164,12 +173,16 @@ async def create_user(
     current_user: User = Depends(RoleChecker([UserRole.ADMIN])),
     db: AsyncSession = Depends(get_async_session),
 ):
-    # Ensure unique username/email in clinic scope
-    exists = await db.execute(select(User).where(User.username == payload.username))
-    if exists.scalar_one_or_none():
+    # Ensure unique username/email in clinic scope, in one round-trip
+    # (both columns are unique, so at most two rows come back)
+    existing = (await db.execute(
+        select(User.username, User.email).where(
+            or_(User.username == payload.username, User.email == payload.email)
+        )
+    )).all()
+    if any(row.username == payload.username for row in existing):
         raise HTTPException(status_code=400, detail="Username already exists")
-    exists = await db.execute(select(User).where(User.email == payload.email))
-    if exists.scalar_one_or_none():
+    if existing:
         raise HTTPException(status_code=400, detail="Email already exists")
 
     # Use provided clinic_id or fallback to current_user's clinic_id
@@ -179,7 +192,7 @@ async def create_user(
     new_user = User(
         username=payload.username,
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await asyncio.to_thread(hash_password, payload.password),
         first_name=payload.first_name or "",
         last_name=payload.last_name or "",
         role=payload.role,
@@ -216,44 +229,57 @@ async def update_user(
     is_super = await is_super_admin(current_user, db)
     
     # SuperAdmin can update users from any clinic, others only from their clinic
-    if is_super:
-        query = select(User).where(User.id == user_id)
-    else:
-        query = select(User).where(and_(User.id == user_id, User.clinic_id == current_user.clinic_id))
-    
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Check email uniqueness if being updated
-    if payload.email is not None and payload.email != user.email:
-        exists = await db.execute(select(User).where(User.email == payload.email))
-        if exists.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Email already exists")
-        user.email = payload.email
+    user_filter = [User.id == user_id]
+    if not is_super:
+        user_filter.append(User.clinic_id == current_user.clinic_id)
     
+    changes = {}
+    if payload.email is not None:
+        # Uniqueness is enforced by the unique index on users.email
+        changes["email"] = payload.email
     if payload.first_name is not None:
-        user.first_name = payload.first_name
+        changes["first_name"] = payload.first_name
     if payload.last_name is not None:
-        user.last_name = payload.last_name
+        changes["last_name"] = payload.last_name
     if payload.role is not None:
-        user.role = payload.role
+        changes["role"] = payload.role
     if payload.password is not None:
         # Only update password if provided
         if len(payload.password) < 8:
             raise HTTPException(status_code=400, detail="Password must be at least 8 characters long")
-        user.hashed_password = hash_password(payload.password)
+        changes["hashed_password"] = await asyncio.to_thread(hash_password, payload.password)
     if payload.is_active is not None:
-        user.is_active = payload.is_active
+        changes["is_active"] = payload.is_active
     if payload.is_verified is not None:
-        user.is_verified = payload.is_verified
+        changes["is_verified"] = payload.is_verified
     if payload.consultation_room is not None:
         # Normalize empty strings to None
-        user.consultation_room = payload.consultation_room.strip() or None
-
-    await db.commit()
-    await db.refresh(user)
+        changes["consultation_room"] = payload.consultation_room.strip() or None
+    
+    if changes:
+        # Single UPDATE ... RETURNING; populate_existing refreshes the row if it
+        # is already in the session (e.g. an admin updating themselves)
+        try:
+            result = await db.execute(
+                update(User)
+                .where(*user_filter)
+                .values(**changes)
+                .returning(User)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            user = result.scalar_one_or_none()
+            if user:
+                await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if "ix_users_email" in str(e.orig):
+                raise HTTPException(status_code=400, detail="Email already exists")
+            raise
+    else:
+        result = await db.execute(select(User).where(*user_filter))
+        user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
     # Load clinic name for response
     from app.models import Clinic
@@ -282,18 +308,18 @@ async def delete_user(
     is_super = await is_super_admin(current_user, db)
     
     # SuperAdmin can delete users from any clinic, others only from their clinic
+    # (only the id is needed to confirm the user exists in scope)
     if is_super:
-        query = select(User).where(User.id == user_id)
+        query = select(User.id).where(User.id == user_id)
     else:
-        query = select(User).where(and_(User.id == user_id, User.clinic_id == current_user.clinic_id))
+        query = select(User.id).where(and_(User.id == user_id, User.clinic_id == current_user.clinic_id))
     
     result = await db.execute(query)
-    user = result.scalar_one_or_none()
-    if not user:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Prevent deleting yourself
-    if user.id == current_user.id:
+    if user_id == current_user.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete your own account"
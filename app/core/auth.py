@@ -3,6 +3,7 @@ Authentication and Authorization Module
 Handles password hashing, JWT token generation/verification, and user authentication
 """
 
+import asyncio
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
@@ -177,7 +178,8 @@ async def authenticate_user(
     if not user:
         return None
     
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return None
     
     if not user.is_active:
@@ -284,6 +286,9 @@ class RoleChecker:
             allowed_roles: List of UserRole enums that are allowed
         """
         self.allowed_roles = allowed_roles
+        # Set membership for the per-request check; the list keeps the order
+        # used in the error message
+        self._allowed_role_set = frozenset(allowed_roles)
     
     async def __call__(self, current_user: User = Depends(get_current_user)) -> User:
         """
@@ -298,7 +303,7 @@ class RoleChecker:
         Raises:
             HTTPException: If user doesn't have required role
         """
-        if current_user.role not in self.allowed_roles:
+        if current_user.role not in self._allowed_role_set:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Operation not permitted. Required roles: {[role.value for role in self.allowed_roles]}"
@@ -3,7 +3,7 @@ Redis caching utilities for improved performance
 """
 import os
 import json
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 import redis.asyncio as redis
 from functools import wraps
 import hashlib
@@ -55,6 +55,18 @@ class CacheManager:
             print(f"Cache get error: {e}")
             return None
     
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip (None for misses)"""
+        if not self.enabled or not self.redis_client or not keys:
+            return [None] * len(keys)
+        
+        try:
+            values = await self.redis_client.mget(keys)
+            return [json.loads(value) if value else None for value in values]
+        except Exception as e:
+            print(f"Cache get_many error: {e}")
+            return [None] * len(keys)
+    
     async def set(self, key: str, value: Any, ttl: int = 3600):
         """Set value in cache with TTL (default 1 hour)"""
         if not self.enabled or not self.redis_client:
@@ -68,18 +80,69 @@ class CacheManager:
             print(f"Cache set error: {e}")
             return False
     
-    async def delete(self, key: str):
-        """Delete key from cache"""
+    async def set_if_absent(self, key: str, value: Any, ttl: int = 3600) -> Optional[Any]:
+        """
+        Set value only if the key does not exist (SET NX), returning whichever
+        value is stored afterwards, or None when the cache is unavailable
+        """
         if not self.enabled or not self.redis_client:
+            return None
+        
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                _, stored = await pipe.set(key, json.dumps(value), ex=ttl, nx=True).get(key).execute()
+            return json.loads(stored) if stored else None
+        except Exception as e:
+            print(f"Cache set_if_absent error: {e}")
+            return None
+    
+    async def delete(self, *keys: str):
+        """Delete one or more keys from cache"""
+        if not self.enabled or not self.redis_client or not keys:
             return False
         
         try:
-            await self.redis_client.delete(key)
+            await self.redis_client.delete(*keys)
             return True
         except Exception as e:
             print(f"Cache delete error: {e}")
             return False
     
+    async def incr(self, key: str) -> Optional[int]:
+        """Atomically increment an integer counter, returning the new value"""
+        if not self.enabled or not self.redis_client:
+            return None
+        
+        try:
+            return await self.redis_client.incr(key)
+        except Exception as e:
+            print(f"Cache incr error: {e}")
+            return None
+    
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> Optional[int]:
+        """Atomically increment a hash field, returning the new value"""
+        if not self.enabled or not self.redis_client:
+            return None
+        
+        try:
+            return await self.redis_client.hincrby(key, field, amount)
+        except Exception as e:
+            print(f"Cache hincrby error: {e}")
+            return None
+    
+    async def hpopall(self, key: str) -> Dict[str, str]:
+        """Atomically read and delete a whole hash"""
+        if not self.enabled or not self.redis_client:
+            return {}
+        
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                values, _ = await pipe.hgetall(key).delete(key).execute()
+            return values or {}
+        except Exception as e:
+            print(f"Cache hpopall error: {e}")
+            return {}
+    
     async def delete_pattern(self, pattern: str):
         """Delete all keys matching pattern"""
         if not self.enabled or not self.redis_client:
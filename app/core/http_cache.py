@@ -0,0 +1,17 @@
+"""
+HTTP conditional request helpers
+"""
+
+from typing import Optional
+
+from fastapi import Request
+
+
+def not_modified(request: Request, etag: Optional[str]) -> bool:
+    """True if the client's If-None-Match already carries this ETag"""
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return etag in (tag.strip() for tag in if_none_match.split(","))
@@ -0,0 +1,32 @@
+"""
+Static file serving helpers
+"""
+
+import os
+from typing import Any, MutableMapping, Union
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for content-addressed files that never change once written
+    (e.g. avatars, which get a fresh random name on every upload)
+
+    Responses carry a one-year immutable Cache-Control, so browsers and any
+    CDN or proxy in front of the app stop re-requesting them from Python
+    """
+
+    cache_control = "public, max-age=31536000, immutable"
+
+    def file_response(
+        self,
+        full_path: Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: MutableMapping[str, Any],
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = self.cache_control
+        return response
@@ -5,7 +5,7 @@ SQLAlchemy ORM models for the healthcare management system
 
 from sqlalchemy import (
     Column, Integer, String, DateTime, Boolean, Date, Text, 
-    ForeignKey, Enum as SQLEnum, JSON
+    ForeignKey, Enum as SQLEnum, JSON, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
@@ -148,6 +148,10 @@ class User(BaseModel):
     voice_sessions = relationship("VoiceSession", back_populates="user", cascade="all, delete-orphan")
     settings = relationship("UserSettings", back_populates="user", uselist=False, cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('ix_users_clinic_id_updated_at', 'clinic_id', 'updated_at'),
+    )
+    
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', role='{self.role}')>"
     
@@ -206,6 +210,12 @@ class Patient(BaseModel):
     preauth_requests = relationship("PreAuthRequest", back_populates="patient", cascade="all, delete-orphan")
     message_threads = relationship("MessageThread", back_populates="patient", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('ix_patients_clinic_id_updated_at', 'clinic_id', 'updated_at'),
+        # Patient lookup for a logged-in user (case-insensitive email within a clinic)
+        Index('ix_patients_clinic_id_lower_email', 'clinic_id', func.lower(email)),
+    )
+    
     def __repr__(self):
         return f"<Patient(id={self.id}, name='{self.full_name}')>"
     
@@ -7,7 +7,7 @@ from datetime import datetime
 from decimal import Decimal
 from sqlalchemy import (
     Column, Integer, String, Text, Numeric, Boolean, DateTime, 
-    ForeignKey, Enum as SQLEnum
+    ForeignKey, Enum as SQLEnum, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -50,6 +50,10 @@ class ServiceItem(Base):
     # Relationships
     invoice_lines = relationship("InvoiceLine", back_populates="service_item")
 
+    __table_args__ = (
+        Index('ix_service_items_clinic_id_updated_at', 'clinic_id', 'updated_at'),
+    )
+
 
 class Invoice(Base):
     """Patient invoices"""
@@ -2,7 +2,7 @@
 Push Subscription Model
 Stores web push notification subscriptions for users
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -37,6 +37,13 @@ class PushSubscription(Base):
     # Relationships
     user = relationship("User", backref="push_subscriptions")
     
+    __table_args__ = (
+        # Conflict target for the subscribe upsert
+        UniqueConstraint('user_id', 'endpoint', name='uq_push_subscriptions_user_endpoint'),
+        # Sending only reads a user's active subscriptions
+        Index('ix_push_subscriptions_user_active', 'user_id', postgresql_where=text('is_active')),
+    )
+    
     def __repr__(self):
         return f"<PushSubscription(id={self.id}, user_id={self.user_id}, endpoint={self.endpoint[:50]}...)>"
 
@@ -4,7 +4,7 @@ Handles products, stock movements, and inventory tracking
 """
 
 import enum
-from sqlalchemy import Column, Integer, String, Text, Numeric, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, Numeric, Boolean, DateTime, ForeignKey, Enum as SQLEnum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -65,6 +65,17 @@ class Product(Base):
     clinic = relationship("Clinic", back_populates="products")
     procedure_products = relationship("ProcedureProduct", back_populates="product", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_products_clinic_id_updated_at', 'clinic_id', 'updated_at'),
+        Index(
+            'ix_products_lowstock', 'clinic_id',
+            postgresql_where=text('is_active AND current_stock <= min_stock')
+        ),
+    )
+    # Fetch server-generated created_at/updated_at via RETURNING on flush
+    # so write paths don't need a follow-up refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
 class StockMovement(Base):
     """Stock movement transactions"""
     __tablename__ = "stock_movements"
@@ -89,6 +100,11 @@ class StockMovement(Base):
     clinic = relationship("Clinic", back_populates="stock_movements")
     creator = relationship("User", foreign_keys=[created_by])
 
+    __table_args__ = (
+        Index('ix_stock_movements_clinic_id_timestamp', 'clinic_id', timestamp.desc()),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
 class StockAlert(Base):
     """Stock alerts and notifications"""
     __tablename__ = "stock_alerts"
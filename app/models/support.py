@@ -1,8 +1,9 @@
 """
 Support Ticket and Help Article Models
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Boolean, Index, Computed
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import enum
 
@@ -50,10 +51,26 @@ class HelpArticle(Base):
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
     category = Column(String(100), nullable=False)
-    tags = Column(Text, nullable=True)  # JSON array of tags
+    tags = Column(JSONB, nullable=True)  # JSON array of tags
     views = Column(Integer, default=0, nullable=False)
     helpful_count = Column(Integer, default=0, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Full-text document maintained by PostgreSQL (generated column); deferred
+    # so article loads don't ship it back
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('portuguese', coalesce(title, '') || ' ' || coalesce(content, '') || ' ' || coalesce(tags::text, ''))",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+
+    __table_args__ = (
+        Index('ix_help_articles_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_help_articles_tags', 'tags', postgresql_using='gin', postgresql_ops={'tags': 'jsonb_path_ops'}),
+        Index('ix_help_articles_clinic_id_category', 'clinic_id', 'category'),
+    )
 
@@ -3,7 +3,8 @@ TISS Template Model
 Stores XML templates for TISS document generation
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, Enum as SQLEnum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, Enum as SQLEnum, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.models import BaseModel
@@ -33,7 +34,7 @@ class TissTemplate(BaseModel):
     
     # Template Content
     xml_template = Column(Text, nullable=False)  # XML template with variables like {{VARIABLE_NAME}}
-    variables = Column(JSON, nullable=True, default=list)  # List of variable names found in template
+    variables = Column(JSONB, nullable=False, default=list, server_default=text("'[]'::jsonb"))  # List of variable names found in template, written on create/update
     
     # Status
     is_default = Column(Boolean, default=False, nullable=False)
@@ -47,6 +48,11 @@ class TissTemplate(BaseModel):
     clinic = relationship("Clinic", backref="tiss_templates")
     created_by = relationship("User", foreign_keys=[created_by_id])
     
+    __table_args__ = (
+        # Template listings filter on these columns and order by name
+        Index('ix_tiss_templates_list', 'clinic_id', 'category', 'is_active', 'is_default', 'name'),
+    )
+    
     def __repr__(self):
         return f"<TissTemplate(id={self.id}, name='{self.name}', category='{self.category}')>"
     
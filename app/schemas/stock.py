@@ -131,12 +131,12 @@ class StockAlertResponse(StockAlertBase):
 # ==================== Dashboard/Summary Schemas ====================
 
 class StockSummary(BaseModel):
-    total_products: int
-    low_stock_products: int
-    out_of_stock_products: int
-    total_value: float
-    recent_movements: int
-    pending_alerts: int
+    total_products: int = Field(..., description="Active products (exact; summary is cached for up to 30s)")
+    low_stock_products: int = Field(..., description="Active products at or below minimum stock, excluding out of stock")
+    out_of_stock_products: int = Field(..., description="Active products with zero stock")
+    total_value: float = Field(..., description="Sum of current_stock * unit_price over active priced products")
+    recent_movements: int = Field(..., description="Stock movements in the last 7 days")
+    pending_alerts: int = Field(..., description="Unresolved stock alerts")
 
 class LowStockProduct(BaseModel):
     id: int
@@ -1,7 +1,7 @@
 """
 Support Ticket and Help Article Schemas
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 from app.models.support import TicketStatus, TicketPriority
@@ -65,6 +65,11 @@ class HelpArticleResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    @field_validator("tags", mode="before")
+    @classmethod
+    def _null_tags_as_empty(cls, value):
+        return value or []
+
     class Config:
         from_attributes = True
 
@@ -61,3 +61,22 @@ class TissTemplateResponse(TissTemplateBase):
     class Config:
         from_attributes = True
 
+
+
+class TissTemplateListItem(BaseModel):
+    """Schema for TISS template listings (omits the XML body; fetch a single template for it)"""
+    id: int
+    name: str
+    description: Optional[str] = None
+    category: TissTemplateCategory
+    variables: List[str] = Field(default_factory=list, description="List of variables found in template")
+    is_default: bool
+    is_active: bool
+    clinic_id: int
+    created_by_id: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
@@ -3,7 +3,7 @@ User Settings Schemas
 Pydantic schemas for user settings validation and serialization
 """
 from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 
 
@@ -74,3 +74,41 @@ class UserSettingsFullResponse(BaseModel):
     appearance: Dict[str, Any]
     security: Dict[str, Any]
 
+
+
+class ProfileUpdate(BaseModel):
+    """Schema for updating profile fields; only the keys sent are applied"""
+    firstName: Optional[str] = None
+    lastName: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+
+
+class PasswordChange(BaseModel):
+    """
+    Schema for changing the password
+    All fields may be empty (no change requested); the all-or-nothing and
+    length rules are applied by the endpoint
+    """
+    currentPassword: Optional[str] = None
+    newPassword: Optional[str] = None
+    confirmPassword: Optional[str] = None
+
+
+class PushSubscriptionKeys(BaseModel):
+    """Keys from the browser's PushSubscription"""
+    p256dh: str = Field(..., min_length=1)
+    auth: str = Field(..., min_length=1)
+
+
+class PushSubscriptionCreate(BaseModel):
+    """Schema for registering a push subscription"""
+    endpoint: str = Field(..., min_length=1)
+    keys: PushSubscriptionKeys
+    userAgent: Optional[str] = None
+    deviceInfo: Optional[Dict[str, Any]] = None
+
+
+class PushSubscriptionRemove(BaseModel):
+    """Schema for removing a push subscription"""
+    endpoint: str = Field(..., min_length=1)
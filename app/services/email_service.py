@@ -2,6 +2,7 @@
 Email Service
 Handles sending email notifications to users
 """
+import asyncio
 import smtplib
 import os
 from email.mime.text import MIMEText
@@ -73,11 +74,8 @@ class EmailService:
             html_part = MIMEText(html_body, 'html', 'utf-8')
             msg.attach(html_part)
             
-            # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
+            # Send email (smtplib blocks, so keep it off the event loop)
+            await asyncio.to_thread(self._deliver, msg)
             
             logger.info(f"Email sent successfully to {to_email}: {subject}")
             return True
@@ -86,6 +84,13 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def _deliver(self, msg: MIMEMultipart) -> None:
+        """Send a prepared message over SMTP (blocking)"""
+        with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
+            server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+            server.send_message(msg)
+    
     async def send_notification_email(
         self,
         to_email: str,
@@ -237,20 +242,16 @@ async def check_email_notifications_enabled(user_id: int, db) -> bool:
     Returns:
         True if email notifications are enabled, False otherwise
     """
-    from sqlalchemy import select
-    from app.models import UserSettings
+    from app.services.user_settings_cache import get_notification_settings
     
     try:
-        result = await db.execute(
-            select(UserSettings).where(UserSettings.user_id == user_id)
-        )
-        user_settings = result.scalar_one_or_none()
+        user_settings = await get_notification_settings(user_id, db)
         
         if not user_settings:
             # Default to enabled if no settings exist
             return True
         
-        notifications = user_settings.notifications or {}
+        notifications = user_settings["notifications"] or {}
         return notifications.get("email", True)
         
     except Exception as e:
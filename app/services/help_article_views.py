@@ -0,0 +1,79 @@
+"""
+Help Article View Counter Service
+Buffers article view increments in Redis and periodically flushes them to PostgreSQL
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import update, bindparam
+
+from app.core.cache import cache_manager
+from app.models.support import HelpArticle
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of article_id -> views not yet written to the database
+PENDING_VIEWS_KEY = "help_articles:pending_views"
+VIEW_FLUSH_INTERVAL_SECONDS = 30
+
+_help_articles = HelpArticle.__table__
+_apply_view_delta = (
+    update(_help_articles)
+    .where(_help_articles.c.id == bindparam("article_id"))
+    .values(views=_help_articles.c.views + bindparam("delta"))
+)
+
+
+async def record_article_view(article_id: int) -> Optional[int]:
+    """
+    Buffer one view of an article in Redis
+
+    Returns:
+        The article's views still pending a flush (including this one),
+        or None when Redis is unavailable and the caller must count it directly
+    """
+    return await cache_manager.hincrby(PENDING_VIEWS_KEY, str(article_id))
+
+
+async def flush_article_views() -> int:
+    """
+    Write buffered view counts to the database in one executemany UPDATE
+
+    Returns:
+        Number of articles updated
+    """
+    pending = await cache_manager.hpopall(PENDING_VIEWS_KEY)
+    params = [
+        {"article_id": int(article_id), "delta": int(delta)}
+        for article_id, delta in pending.items()
+        if int(delta) > 0
+    ]
+    if not params:
+        return 0
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(_apply_view_delta, params)
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to flush help article views: {str(e)}")
+        # Put the deltas back so the next flush retries them
+        for item in params:
+            await cache_manager.hincrby(PENDING_VIEWS_KEY, str(item["article_id"]), item["delta"])
+        return 0
+
+    return len(params)
+
+
+async def run_article_view_flusher(interval: int = VIEW_FLUSH_INTERVAL_SECONDS):
+    """Flush buffered views every ``interval`` seconds until cancelled, then flush once more"""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush_article_views()
+    except asyncio.CancelledError:
+        await flush_article_views()
+        raise
@@ -5,6 +5,7 @@ while respecting user preferences for notification types
 """
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,14 +27,10 @@ async def check_notification_type_enabled(
     Returns:
         True if notification type is enabled, False otherwise
     """
-    from sqlalchemy import select
-    from app.models import UserSettings
+    from app.services.user_settings_cache import get_notification_settings
     
     try:
-        result = await db.execute(
-            select(UserSettings).where(UserSettings.user_id == user_id)
-        )
-        user_settings = result.scalar_one_or_none()
+        user_settings = await get_notification_settings(user_id, db)
         
         if not user_settings:
             # Default values based on notification type
@@ -44,7 +41,7 @@ async def check_notification_type_enabled(
             }
             return defaults.get(notification_type, False)
         
-        notifications = user_settings.notifications or {}
+        notifications = user_settings["notifications"] or {}
         return notifications.get(notification_type, False)
         
     except Exception as e:
@@ -108,28 +105,31 @@ async def send_notification(
         logger.info(f"Notification category '{notification_category}' disabled for user {user_id}, skipping all channels")
         return results
     
-    # Get user information
-    from sqlalchemy import select
-    from app.models import User, UserSettings
+    # Get user information (from the identity map when the caller already loaded it)
+    from app.models import User
+    from app.services.user_settings_cache import get_notification_settings
     
-    user_result = await db.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one_or_none()
+    user = await db.get(User, user_id)
     
     if not user:
         logger.error(f"User {user_id} not found")
         return results
     
-    # Get user settings for phone number
-    settings_result = await db.execute(
-        select(UserSettings).where(UserSettings.user_id == user_id)
-    )
-    user_settings = settings_result.scalar_one_or_none()
-    user_phone = user_settings.phone if user_settings else None
+    # Get user settings for phone number (already cached by the category check)
+    user_settings = await get_notification_settings(user_id, db)
+    user_phone = user_settings["phone"] if user_settings else None
     
-    # Send email notification
-    try:
-        from app.services.email_service import send_notification_email_if_enabled
-        email_sent = await send_notification_email_if_enabled(
+    from app.services.email_service import send_notification_email_if_enabled
+    from app.services.sms_service import send_notification_sms_if_enabled
+    from app.services.push_service import send_push_notification_if_enabled
+    
+    async def _no_phone() -> bool:
+        return False
+    
+    # The channels are independent network calls, so send them concurrently.
+    # Only push touches the session beyond the (already cached) preference check.
+    email_result, sms_result, push_result = await asyncio.gather(
+        send_notification_email_if_enabled(
             user_id=user_id,
             user_email=user.email,
             notification_title=notification_title,
@@ -137,34 +137,15 @@ async def send_notification(
             notification_type=notification_type,
             action_url=action_url,
             db=db,
-        )
-        results['email']['sent'] = email_sent
-    except Exception as e:
-        logger.error(f"Failed to send email notification: {str(e)}")
-        results['email']['error'] = str(e)
-    
-    # Send SMS notification
-    if user_phone:
-        try:
-            from app.services.sms_service import send_notification_sms_if_enabled
-            sms_sent = await send_notification_sms_if_enabled(
-                user_id=user_id,
-                user_phone=user_phone,
-                notification_title=notification_title,
-                notification_message=notification_message,
-                db=db,
-            )
-            results['sms']['sent'] = sms_sent
-        except Exception as e:
-            logger.error(f"Failed to send SMS notification: {str(e)}")
-            results['sms']['error'] = str(e)
-    else:
-        results['sms']['error'] = 'Phone number not found'
-    
-    # Send push notification
-    try:
-        from app.services.push_service import send_push_notification_if_enabled
-        push_count = await send_push_notification_if_enabled(
+        ),
+        send_notification_sms_if_enabled(
+            user_id=user_id,
+            user_phone=user_phone,
+            notification_title=notification_title,
+            notification_message=notification_message,
+            db=db,
+        ) if user_phone else _no_phone(),
+        send_push_notification_if_enabled(
             user_id=user_id,
             title=notification_title,
             body=notification_message,
@@ -172,12 +153,30 @@ async def send_notification(
             data={'url': action_url} if action_url else None,
             tag=notification_category,
             db=db,
-        )
-        results['push']['sent'] = push_count > 0
-        results['push']['count'] = push_count
-    except Exception as e:
-        logger.error(f"Failed to send push notification: {str(e)}")
-        results['push']['error'] = str(e)
+        ),
+        return_exceptions=True,
+    )
+    
+    if isinstance(email_result, Exception):
+        logger.error(f"Failed to send email notification: {str(email_result)}")
+        results['email']['error'] = str(email_result)
+    else:
+        results['email']['sent'] = email_result
+    
+    if not user_phone:
+        results['sms']['error'] = 'Phone number not found'
+    elif isinstance(sms_result, Exception):
+        logger.error(f"Failed to send SMS notification: {str(sms_result)}")
+        results['sms']['error'] = str(sms_result)
+    else:
+        results['sms']['sent'] = sms_result
+    
+    if isinstance(push_result, Exception):
+        logger.error(f"Failed to send push notification: {str(push_result)}")
+        results['push']['error'] = str(push_result)
+    else:
+        results['push']['sent'] = push_result > 0
+        results['push']['count'] = push_result
     
     return results
 
@@ -2,6 +2,7 @@
 Push Notification Service
 Handles sending web push notifications to users
 """
+import asyncio
 import json
 import os
 import base64
@@ -117,8 +118,9 @@ class PushService:
                 # If decoding fails, assume it's already in PEM format
                 pass
             
-            # Send push notification
-            webpush(
+            # Send push notification (pywebpush is synchronous)
+            await asyncio.to_thread(
+                webpush,
                 subscription_info=subscription_info,
                 data=json.dumps(payload),
                 vapid_private_key=private_key,
@@ -238,20 +240,16 @@ async def check_push_notifications_enabled(user_id: int, db) -> bool:
     Returns:
         True if push notifications are enabled, False otherwise
     """
-    from sqlalchemy import select
-    from app.models import UserSettings
+    from app.services.user_settings_cache import get_notification_settings
     
     try:
-        result = await db.execute(
-            select(UserSettings).where(UserSettings.user_id == user_id)
-        )
-        user_settings = result.scalar_one_or_none()
+        user_settings = await get_notification_settings(user_id, db)
         
         if not user_settings:
             # Default to enabled if no settings exist
             return True
         
-        notifications = user_settings.notifications or {}
+        notifications = user_settings["notifications"] or {}
         return notifications.get("push", True)
         
     except Exception as e:
@@ -3,6 +3,7 @@ SMS Service
 Handles sending SMS notifications to users
 Supports multiple providers (Twilio, AWS SNS, etc.)
 """
+import asyncio
 import os
 import re
 from typing import Optional
@@ -129,8 +130,9 @@ class SMSService:
             
             client = Client(self.twilio_account_sid, self.twilio_auth_token)
             
-            # Send SMS
-            twilio_message = client.messages.create(
+            # Send SMS (the Twilio client is synchronous)
+            twilio_message = await asyncio.to_thread(
+                client.messages.create,
                 body=message,
                 from_=self.twilio_from_number,
                 to=to_phone
@@ -184,20 +186,16 @@ async def check_sms_notifications_enabled(user_id: int, db) -> bool:
     Returns:
         True if SMS notifications are enabled, False otherwise
     """
-    from sqlalchemy import select
-    from app.models import UserSettings
+    from app.services.user_settings_cache import get_notification_settings
     
     try:
-        result = await db.execute(
-            select(UserSettings).where(UserSettings.user_id == user_id)
-        )
-        user_settings = result.scalar_one_or_none()
+        user_settings = await get_notification_settings(user_id, db)
         
         if not user_settings:
             # Default to disabled if no settings exist (SMS costs money)
             return False
         
-        notifications = user_settings.notifications or {}
+        notifications = user_settings["notifications"] or {}
         return notifications.get("sms", False)
         
     except Exception as e:
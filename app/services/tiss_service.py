@@ -4,7 +4,10 @@ Generates TISS standard XML files for health insurance billing
 """
 
 from datetime import datetime, date
-from typing import Optional, List
+import asyncio
+import hashlib
+import zipfile
+from typing import AsyncIterator, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload, joinedload
@@ -20,6 +23,25 @@ from app.models.tiss import (
 from app.services.tiss_validator import validate_tiss_document
 from app.models import Invoice, InvoiceLine, ServiceItem, Patient, User, Clinic, Appointment
 from app.core.auth import get_current_user
+from app.core.cache import cache_manager
+from database import AsyncSessionLocal
+
+# Invoices rendered in parallel worker threads per batch window
+TISS_BATCH_CONCURRENCY = 8
+# Invoices loaded (with their full option tree) per query while streaming a batch
+TISS_BATCH_LOAD_SIZE = 64
+# Generated XML is cached under a fingerprint of its inputs (see _tiss_xml_cache_key)
+TISS_XML_CACHE_TTL = 86400  # 24 hours
+
+
+def tiss_invoice_load_options():
+    """Eager-load options for everything _build_tiss_document_sync reads from an invoice"""
+    return (
+        joinedload(Invoice.patient),
+        joinedload(Invoice.appointment).joinedload(Appointment.doctor),
+        joinedload(Invoice.clinic),
+        joinedload(Invoice.invoice_lines).joinedload(InvoiceLine.service_item),
+    )
 
 
 async def generate_tiss_xml(invoice_id: int, db: AsyncSession, skip_validation: bool = False) -> str:
@@ -35,12 +57,7 @@ async def generate_tiss_xml(invoice_id: int, db: AsyncSession, skip_validation:
         XML string in TISS format
     """
     # Fetch invoice with all related data
-    invoice_query = select(Invoice).options(
-        joinedload(Invoice.patient),
-        joinedload(Invoice.appointment).joinedload(Appointment.doctor),
-        joinedload(Invoice.clinic),
-        joinedload(Invoice.invoice_lines).joinedload(InvoiceLine.service_item)
-    ).filter(Invoice.id == invoice_id)
+    invoice_query = select(Invoice).options(*tiss_invoice_load_options()).filter(Invoice.id == invoice_id)
     
     invoice_result = await db.execute(invoice_query)
     invoice = invoice_result.unique().scalar_one_or_none()
@@ -48,8 +65,71 @@ async def generate_tiss_xml(invoice_id: int, db: AsyncSession, skip_validation:
     if not invoice:
         raise ValueError(f"Invoice {invoice_id} not found")
     
+    return await render_tiss_xml(invoice, skip_validation=skip_validation)
+
+
+async def render_tiss_xml(invoice: Invoice, skip_validation: bool = False) -> str:
+    """
+    Generate TISS XML for an invoice already loaded with tiss_invoice_load_options()
+    
+    Args:
+        invoice: Invoice with patient, appointment/doctor, clinic and lines loaded
+        skip_validation: If True, skip validation and generate XML anyway
+        
+    Returns:
+        XML string in TISS format
+    """
+    cache_key = _tiss_xml_cache_key(invoice, skip_validation)
+    cached = await cache_manager.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Building, validating and pretty-printing the XML is CPU-bound; keep it
+    # off the event loop
+    xml_content = await asyncio.to_thread(_render_tiss_xml_sync, invoice, skip_validation)
+    await cache_manager.set(cache_key, xml_content, TISS_XML_CACHE_TTL)
+    return xml_content
+
+
+def _tiss_xml_cache_key(invoice: Invoice, skip_validation: bool = False) -> str:
+    """
+    Cache key fingerprinting everything the generated XML depends on: the
+    invoice, its lines and service items, the identity and version of its
+    patient, clinic, appointment and doctor, plus today's date (used as the
+    batch send date)
+    """
+    doctor = invoice.appointment.doctor if invoice.appointment else None
+    fingerprint = (
+        invoice.updated_at, invoice.issue_date, invoice.total_amount,
+        invoice.patient_id, getattr(invoice.patient, "updated_at", None),
+        invoice.clinic_id, getattr(invoice.clinic, "updated_at", None),
+        invoice.appointment_id, getattr(invoice.appointment, "updated_at", None),
+        getattr(doctor, "id", None), getattr(doctor, "updated_at", None),
+        tuple(
+            (line.id, line.quantity, line.unit_price, line.line_total,
+             line.service_item_id, getattr(line.service_item, "updated_at", None))
+            for line in invoice.invoice_lines
+        ),
+        skip_validation,
+        date.today(),
+    )
+    digest = hashlib.sha1(repr(fingerprint).encode()).hexdigest()
+    return f"tiss_xml:{invoice.id}:{digest}"
+
+
+async def validate_invoice_tiss(invoice: Invoice) -> dict:
+    """Build and validate the TISS document for a loaded invoice in a worker thread"""
+    return await asyncio.to_thread(_validate_invoice_tiss_sync, invoice)
+
+
+def _validate_invoice_tiss_sync(invoice: Invoice) -> dict:
+    return validate_tiss_document(_build_tiss_document_sync(invoice))
+
+
+def _render_tiss_xml_sync(invoice: Invoice, skip_validation: bool = False) -> str:
+    """Synchronous core of render_tiss_xml; only reads already-loaded attributes"""
     # Build TISS document structure
-    tiss_doc = await _build_tiss_document(invoice)
+    tiss_doc = _build_tiss_document_sync(invoice)
     
     # Validate TISS document (unless skipped)
     # Also skip validation if we detect test values (which means real data is invalid)
@@ -80,8 +160,8 @@ async def generate_tiss_xml(invoice_id: int, db: AsyncSession, skip_validation:
     return xml_content
 
 
-async def _build_tiss_document(invoice: Invoice) -> TISSDocumento:
-    """Build TISS document structure from invoice data"""
+def _build_tiss_document_sync(invoice: Invoice) -> TISSDocumento:
+    """Build TISS document structure from invoice data (no I/O)"""
     
     # Validate required data
     if not invoice.clinic:
@@ -391,38 +471,88 @@ def _tiss_to_xml(tiss_doc: TISSDocumento) -> str:
     return pretty_xml.decode('utf-8')
 
 
-async def generate_batch_tiss_xml(invoice_ids: List[int], db: AsyncSession) -> bytes:
+class _ZipChunkSink:
+    """Write-only file object that collects ZIP output until the stream drains it"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _render_batch_entry(invoice: Invoice, cached_xml: Optional[str], cache_key: str) -> Tuple[str, str]:
+    """Render one batch entry in a worker thread, returning (filename, content)"""
+    if cached_xml is not None:
+        return f"tiss_invoice_{invoice.id:06d}.xml", cached_xml
+    try:
+        xml_content = await asyncio.to_thread(_render_tiss_xml_sync, invoice)
+        await cache_manager.set(cache_key, xml_content, TISS_XML_CACHE_TTL)
+        return f"tiss_invoice_{invoice.id:06d}.xml", xml_content
+    except Exception as e:
+        # Add error file to ZIP
+        error_content = f"Error generating TISS XML for invoice {invoice.id}: {str(e)}"
+        return f"error_invoice_{invoice.id:06d}.txt", error_content
+
+
+async def iter_batch_tiss_zip(invoice_ids: List[int], clinic_id: int) -> AsyncIterator[bytes]:
     """
-    Generate TISS XML for multiple invoices and return as ZIP file
+    Stream a ZIP of TISS XML files, yielding entries as soon as they are written
+    
+    Invoices are loaded TISS_BATCH_LOAD_SIZE at a time on a session owned by
+    the stream (the request session is closed once streaming starts), and
+    rendered concurrently in windows of TISS_BATCH_CONCURRENCY worker threads.
+    Entries are ordered by invoice id.
     
     Args:
-        invoice_ids: List of invoice IDs to generate TISS XML for
-        db: Database session
+        invoice_ids: IDs of invoices already verified to belong to the clinic
+        clinic_id: Clinic the invoices belong to
         
-    Returns:
-        ZIP file content as bytes
+    Yields:
+        Chunks of the ZIP file
     """
-    import zipfile
-    import io
-    
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for invoice_id in invoice_ids:
-            try:
-                # Generate TISS XML for each invoice
-                xml_content = await generate_tiss_xml(invoice_id, db)
+    ordered_ids = sorted(set(invoice_ids))
+    sink = _ZipChunkSink()
+    
+    async with AsyncSessionLocal() as db:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for load_start in range(0, len(ordered_ids), TISS_BATCH_LOAD_SIZE):
+                invoice_query = select(Invoice).options(*tiss_invoice_load_options()).filter(
+                    Invoice.id.in_(ordered_ids[load_start:load_start + TISS_BATCH_LOAD_SIZE]),
+                    Invoice.clinic_id == clinic_id
+                ).order_by(Invoice.id)
+                invoice_result = await db.execute(invoice_query)
+                invoices = invoice_result.unique().scalars().all()
+                # End the read transaction so the pooled connection is returned
+                # while this chunk renders and streams, instead of sitting idle
+                # in transaction for the life of the download
+                await db.commit()
                 
-                # Add to ZIP file
-                filename = f"tiss_invoice_{invoice_id:06d}.xml"
-                zip_file.writestr(filename, xml_content)
+                for start in range(0, len(invoices), TISS_BATCH_CONCURRENCY):
+                    window = invoices[start:start + TISS_BATCH_CONCURRENCY]
+                    cache_keys = [_tiss_xml_cache_key(invoice) for invoice in window]
+                    cached_xmls = await cache_manager.get_many(cache_keys)
+                    entries = await asyncio.gather(*(
+                        _render_batch_entry(invoice, cached_xml, cache_key)
+                        for invoice, cached_xml, cache_key in zip(window, cached_xmls, cache_keys)
+                    ))
+                    
+                    for filename, content in entries:
+                        zip_file.writestr(filename, content)
+                    
+                    yield sink.drain()
                 
-            except Exception as e:
-                # Add error file to ZIP
-                error_content = f"Error generating TISS XML for invoice {invoice_id}: {str(e)}"
-                error_filename = f"error_invoice_{invoice_id:06d}.txt"
-                zip_file.writestr(error_filename, error_content)
-    
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
+                # Release the rendered invoice graphs before loading the next chunk
+                db.expunge_all()
+        
+        # Central directory is written when the archive closes
+        yield sink.drain()
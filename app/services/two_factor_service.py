@@ -2,6 +2,7 @@
 Two Factor Authentication Service
 Handles 2FA setup, verification, and management
 """
+import asyncio
 import pyotp
 import qrcode
 import io
@@ -9,10 +10,21 @@ import base64
 from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from cachetools import TTLCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-process cache of is_2fa_enabled, which the status endpoint is polled for.
+# Changes made in this process invalidate it; other workers see them within the TTL
+TWO_FACTOR_STATUS_CACHE_TTL = 30
+_2fa_status_cache: TTLCache = TTLCache(maxsize=4096, ttl=TWO_FACTOR_STATUS_CACHE_TTL)
+
+
+def invalidate_2fa_status(user_id: int) -> None:
+    """Forget the cached 2FA status for a user after their security settings change"""
+    _2fa_status_cache.pop(user_id, None)
+
 
 class TwoFactorService:
     """Service for managing two-factor authentication"""
@@ -89,16 +101,33 @@ class TwoFactorService:
         db: AsyncSession
     ) -> Dict[str, Any]:
         """Setup 2FA for a user"""
-        from app.models import UserSettings
-        
         # Generate new secret
         secret = TwoFactorService.generate_secret()
         
         # Generate QR code URI
         qr_uri = TwoFactorService.generate_qr_code_uri(secret, user_email)
         
-        # Generate QR code image
-        qr_image = TwoFactorService.generate_qr_code_image(qr_uri)
+        # Rendering the QR PNG is CPU-bound; do it in a thread while the secret
+        # is written, rather than blocking the event loop before the write
+        qr_image, _ = await asyncio.gather(
+            asyncio.to_thread(TwoFactorService.generate_qr_code_image, qr_uri),
+            TwoFactorService._store_pending_secret(user_id, secret, db),
+        )
+        
+        return {
+            "secret": secret,
+            "qr_uri": qr_uri,
+            "qr_image": qr_image,
+        }
+    
+    @staticmethod
+    async def _store_pending_secret(
+        user_id: int,
+        secret: str,
+        db: AsyncSession
+    ) -> None:
+        """Store a new, not yet verified 2FA secret, creating the user's settings if needed"""
+        from app.models import UserSettings
         
         # Get or create user settings
         result = await db.execute(
@@ -118,19 +147,16 @@ class TwoFactorService:
             )
             db.add(user_settings)
         
-        # Store secret temporarily (will be confirmed after verification)
-        if not user_settings.security:
-            user_settings.security = {}
-        user_settings.security["twoFactorSecret"] = secret
-        user_settings.security["twoFactorEnabled"] = False  # Not enabled until verified
+        # Store secret temporarily (will be confirmed after verification).
+        # Assign a new dict: in-place changes to a JSON column aren't detected
+        user_settings.security = {
+            **(user_settings.security or {}),
+            "twoFactorSecret": secret,
+            "twoFactorEnabled": False,  # Not enabled until verified
+        }
         
         await db.commit()
-        
-        return {
-            "secret": secret,
-            "qr_uri": qr_uri,
-            "qr_image": qr_image,
-        }
+        invalidate_2fa_status(user_id)
     
     @staticmethod
     async def verify_and_enable_2fa(
@@ -158,11 +184,16 @@ class TwoFactorService:
             if not TwoFactorService.verify_code(secret, code):
                 return False
             
-            # Enable 2FA
-            user_settings.security["twoFactorEnabled"] = True
-            user_settings.security["twoFactorAuth"] = True  # Also update the main setting
+            # Enable 2FA, also updating the main setting.
+            # Assign a new dict: in-place changes to a JSON column aren't detected
+            user_settings.security = {
+                **user_settings.security,
+                "twoFactorEnabled": True,
+                "twoFactorAuth": True,
+            }
             
             await db.commit()
+            invalidate_2fa_status(user_id)
             return True
         except Exception as e:
             logger.error(f"Error verifying and enabling 2FA: {str(e)}")
@@ -186,15 +217,21 @@ class TwoFactorService:
             if not user_settings:
                 return False
             
-            if not user_settings.security:
-                user_settings.security = {}
-            
-            # Remove secret and disable 2FA
-            user_settings.security.pop("twoFactorSecret", None)
-            user_settings.security["twoFactorEnabled"] = False
-            user_settings.security["twoFactorAuth"] = False
+            # Remove secret and disable 2FA.
+            # Assign a new dict: in-place changes to a JSON column aren't detected
+            security = {
+                key: value
+                for key, value in (user_settings.security or {}).items()
+                if key != "twoFactorSecret"
+            }
+            user_settings.security = {
+                **security,
+                "twoFactorEnabled": False,
+                "twoFactorAuth": False,
+            }
             
             await db.commit()
+            invalidate_2fa_status(user_id)
             return True
         except Exception as e:
             logger.error(f"Error disabling 2FA: {str(e)}")
@@ -206,20 +243,24 @@ class TwoFactorService:
         user_id: int,
         db: AsyncSession
     ) -> bool:
-        """Check if 2FA is enabled for a user"""
+        """Check if 2FA is enabled for a user (cached per process for a short TTL)"""
         from app.models import UserSettings
         
+        cached = _2fa_status_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
         try:
             result = await db.execute(
-                select(UserSettings).where(UserSettings.user_id == user_id)
+                select(UserSettings.security).where(UserSettings.user_id == user_id)
             )
-            user_settings = result.scalar_one_or_none()
+            security = result.scalar_one_or_none()
             
-            if not user_settings or not user_settings.security:
-                return False
-            
-            return user_settings.security.get("twoFactorEnabled", False) or \
-                   user_settings.security.get("twoFactorAuth", False)
+            enabled = bool(security) and bool(
+                security.get("twoFactorEnabled", False) or security.get("twoFactorAuth", False)
+            )
+            _2fa_status_cache[user_id] = enabled
+            return enabled
         except Exception as e:
             logger.error(f"Error checking 2FA status: {str(e)}")
             return False
@@ -0,0 +1,65 @@
+"""
+UserSettings lookups for notification checks
+Notification checks read the same user's settings several times per request;
+the fields they need are kept in the session for the request and in Redis
+across requests, so repeat checks skip the database
+"""
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache_manager
+from app.models import UserSettings
+
+_SESSION_KEY = "notification_settings_by_user_id"
+
+# Preferences change rarely and writes invalidate the key, so the TTL only
+# bounds staleness from writers that bypass invalidate_notification_settings
+NOTIFICATION_SETTINGS_TTL = 300
+
+
+def _notification_settings_key(user_id: int) -> str:
+    return f"user_settings:{user_id}:notifications"
+
+
+async def get_notification_settings(user_id: int, db: AsyncSession) -> Optional[Dict[str, Any]]:
+    """
+    Return ``{"notifications": dict | None, "phone": str | None}`` for a user,
+    or None when they have no settings row
+
+    Looked up in the session (one request), then Redis, then the database
+    (cache-aside)
+    """
+    cache = db.info.setdefault(_SESSION_KEY, {})
+    if user_id in cache:
+        return cache[user_id]
+
+    key = _notification_settings_key(user_id)
+    # Stored wrapped, so a user without a settings row is a hit rather than a miss
+    cached = await cache_manager.get(key)
+    if cached is not None:
+        snapshot = cached["settings"]
+    else:
+        result = await db.execute(
+            select(UserSettings.notifications, UserSettings.phone)
+            .where(UserSettings.user_id == user_id)
+        )
+        row = result.one_or_none()
+        snapshot = {"notifications": row.notifications, "phone": row.phone} if row else None
+        await cache_manager.set(key, {"settings": snapshot}, ttl=NOTIFICATION_SETTINGS_TTL)
+
+    cache[user_id] = snapshot
+    return snapshot
+
+
+def forget_user_settings(user_id: int, db: AsyncSession) -> None:
+    """Drop the session's cached settings after they have been written in this session"""
+    db.info.get(_SESSION_KEY, {}).pop(user_id, None)
+
+
+async def invalidate_notification_settings(user_id: int, db: AsyncSession) -> None:
+    """Drop a user's cached notification settings everywhere; call after committing a change"""
+    forget_user_settings(user_id, db)
+    await cache_manager.delete(_notification_settings_key(user_id))
@@ -1,7 +1,9 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from fastapi import Depends
 import os
+import uuid
 from dotenv import load_dotenv
 import logging
 
@@ -22,35 +24,61 @@ ECHO_SQL = (ENVIRONMENT == "development" and DEBUG)
 
 # Connection pool configuration to prevent connection exhaustion
 # These settings help prevent intermittent connection failures
-POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # Number of connections to maintain
-MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Additional connections beyond pool_size
+# The pool is per worker process: workers * (pool_size + max_overflow) must stay
+# below the server's max_connections (or PgBouncer's default_pool_size)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "25"))  # Number of connections to maintain
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Additional connections beyond pool_size
 POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a connection
-POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))  # Recycle connections after 1 hour
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Recycle connections after 30 minutes
 POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"  # Test connections before using
 
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+USE_PGBOUNCER = os.getenv("DB_USE_PGBOUNCER", "False").lower() == "true"
+
 logger = logging.getLogger(__name__)
 
+
+def _build_connect_args() -> dict:
+    """asyncpg connect arguments, adjusted for PgBouncer transaction pooling"""
+    if USE_PGBOUNCER:
+        # PgBouncer hands each transaction to any server connection, so
+        # named prepared statements cannot be cached per connection, and it
+        # rejects startup parameters other than application_name
+        return {
+            "server_settings": {"application_name": "prontivus_backend"},
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            "command_timeout": 60,
+        }
+    return {
+        "server_settings": {
+            "application_name": "prontivus_backend",
+            "tcp_keepalives_idle": "600",  # Start keepalives after 10 minutes of inactivity
+            "tcp_keepalives_interval": "30",  # Send keepalive every 30 seconds
+            "tcp_keepalives_count": "3",  # Close connection after 3 failed keepalives
+        },
+        "command_timeout": 60,  # 60 second timeout for commands
+    }
+
+
 try:
     engine = create_async_engine(
         DATABASE_URL,
         echo=ECHO_SQL,  # Only echo SQL in development
         future=True,
+        poolclass=AsyncAdaptedQueuePool,  # asyncio-safe queue pool (the async default, pinned explicitly)
         pool_pre_ping=POOL_PRE_PING,  # Test connections before using them
         pool_size=POOL_SIZE,  # Number of connections to maintain
         max_overflow=MAX_OVERFLOW,  # Additional connections beyond pool_size
         pool_timeout=POOL_TIMEOUT,  # Seconds to wait for a connection
         pool_recycle=POOL_RECYCLE,  # Recycle connections after this many seconds
-        connect_args={
-            "server_settings": {
-                "application_name": "prontivus_backend",
-                "tcp_keepalives_idle": "600",  # Start keepalives after 10 minutes of inactivity
-                "tcp_keepalives_interval": "30",  # Send keepalive every 30 seconds
-                "tcp_keepalives_count": "3",  # Close connection after 3 failed keepalives
-            },
-            "command_timeout": 60,  # 60 second timeout for commands
-        },
+        connect_args=_build_connect_args(),
+    )
+    logger.info(
+        f"Database engine created with {engine.pool.__class__.__name__} pool_size={POOL_SIZE}, "
+        f"max_overflow={MAX_OVERFLOW}, pgbouncer={USE_PGBOUNCER}"
     )
-    logger.info(f"Database engine created with pool_size={POOL_SIZE}, max_overflow={MAX_OVERFLOW}")
 except Exception as e:
     logger.error(f"Failed to create database engine: {e}", exc_info=True)
     raise
@@ -89,3 +117,16 @@ async def get_db():
 # Alias for consistency
 get_async_session = get_db
 
+
+async def get_read_session(session: AsyncSession = Depends(get_db)):
+    """
+    Request session for read-only endpoints, switched to AUTOCOMMIT so its
+    queries run without a BEGIN/COMMIT pair
+    
+    Shares the request's cached get_db session, so it must be declared before
+    any dependency that queries (e.g. get_current_user); if the session has
+    already started a transaction it is yielded unchanged.
+    """
+    if not session.in_transaction():
+        await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    yield session
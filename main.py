@@ -4,22 +4,25 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import traceback
 import os
 import json
 
 # Import API routers
-from app.api.endpoints import auth, patients, appointments, users, clinical, financial, tiss, tiss_batch, tiss_templates, stock, procedures, analytics, admin, licenses, voice, migration, files, patient_calling, websocket_calling, websocket_messages, notifications, user_settings, tiss_config, messages, menu, rbac_test, patient_dashboard, secretary_dashboard, doctor_dashboard, ai_config, ai_usage, fiscal_config, reports, payment_methods, report_config, support, documents, ai_diagnosis, feedback
+from app.api.endpoints import auth, patients, appointments, users, clinical, financial, tiss, tiss_templates, stock, procedures, analytics, admin, licenses, voice, migration, files, patient_calling, websocket_calling, websocket_messages, notifications, user_settings, tiss_config, messages, menu, rbac_test, patient_dashboard, secretary_dashboard, doctor_dashboard, ai_config, ai_usage, fiscal_config, reports, payment_methods, report_config, support, documents, ai_diagnosis, feedback
 from app.api.endpoints import icd10
 
 # Import security middleware
 from app.core.middleware import SecurityMiddleware, AuthenticationMiddleware, SecurityHeadersMiddleware, LoginAttemptMiddleware
+from app.core.static_files import ImmutableStaticFiles
 from app.middleware.licensing import licensing_middleware
 
 # Import monitoring and caching
 from app.core.monitoring import init_sentry
 from app.core.cache import cache_manager
+from app.services.help_article_views import run_article_view_flusher
 
 # Get CORS origins from environment variable
 def get_cors_origins():
@@ -48,12 +51,21 @@ async def lifespan(app: FastAPI):
     
     # Connect to Redis cache
     await cache_manager.connect()
+    view_flusher = None
     if cache_manager.enabled:
         print("✅ Redis cache connected")
+        # Periodically persist help article views buffered in Redis
+        view_flusher = asyncio.create_task(run_article_view_flusher())
     
     yield
     
-    # Shutdown: Close connections
+    # Shutdown: Flush pending views and close connections
+    if view_flusher:
+        view_flusher.cancel()
+        try:
+            await view_flusher
+        except asyncio.CancelledError:
+            pass
     await cache_manager.disconnect()
     print("👋 Prontivus API shutting down...")
 
@@ -237,6 +249,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         )
 
 # Mount static files for avatars and uploads
+# Avatar names are unique per upload, so they can be cached indefinitely;
+# mounted first so it takes precedence over the generic /storage mount
+app.mount("/storage/avatars", ImmutableStaticFiles(directory=user_settings.AVATAR_DIR), name="avatars")
 STORAGE_DIR = os.getenv("STORAGE_DIR", "storage")
 if os.path.exists(STORAGE_DIR):
     app.mount("/storage", StaticFiles(directory=STORAGE_DIR), name="storage")
@@ -255,7 +270,6 @@ app.include_router(users.router, prefix=API_V1_PREFIX, tags=["Users"])
 app.include_router(financial.router, prefix=f"{API_V1_PREFIX}/financial", tags=["Financial"])
 app.include_router(tiss.router, prefix=API_V1_PREFIX, tags=["TISS"])
 app.include_router(tiss_templates.router, prefix=f"{API_V1_PREFIX}/financial", tags=["TISS Templates"])
-app.include_router(tiss_batch.router, prefix=API_V1_PREFIX, tags=["TISS Batch"])
 app.include_router(stock.router, prefix=API_V1_PREFIX, tags=["Stock"])
 app.include_router(procedures.router, prefix=API_V1_PREFIX, tags=["Procedures"])
 app.include_router(analytics.router, prefix=API_V1_PREFIX, tags=["Analytics"])
@@ -298,7 +312,6 @@ app.include_router(users.router, prefix="/api", tags=["Users (Legacy)"], depreca
 app.include_router(financial.router, prefix="/api/financial", tags=["Financial (Legacy)"], deprecated=True)
 app.include_router(tiss.router, prefix="/api", tags=["TISS (Legacy)"], deprecated=True)
 app.include_router(tiss_templates.router, prefix="/api/financial", tags=["TISS Templates (Legacy)"], deprecated=True)
-app.include_router(tiss_batch.router, prefix="/api", tags=["TISS Batch (Legacy)"], deprecated=True)
 app.include_router(stock.router, prefix="/api", tags=["Stock (Legacy)"], deprecated=True)
 app.include_router(procedures.router, prefix="/api", tags=["Procedures (Legacy)"], deprecated=True)
 app.include_router(analytics.router, prefix="/api", tags=["Analytics (Legacy)"], deprecated=True)